@@ -1,318 +1,773 @@
 '''program written by Kelvin Wang'''
 
+import collections
+import json
+import os
+import sys
+import time
+import tracemalloc
 import numpy as np
-import matplotlib.pyplot as plt
+# matplotlib is only imported when something is plotted (see pyplot below), so computing and exporting patterns only needs numpy.
+
+
+def has_display(): # False on a Linux/Unix machine without an X11 or Wayland display, e.g. a server or a worker process.
+    return sys.platform in ("win32", "darwin") or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def pyplot(headless = False): # imports and returns matplotlib.pyplot on first use, with the non-interactive Agg backend if there is no display or headless is True.
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        if (headless or not has_display()) and "MPLBACKEND" not in os.environ: matplotlib.use("Agg") # a backend chosen in MPLBACKEND is kept.
+    import matplotlib.pyplot
+    return matplotlib.pyplot
+
+
+class Wedge_View: # a lazy, read-only view of an int32 array of vertex ids of one wedge as point IDs p(i,j,0), creases {p1,p2} or facets {p1,p2,p3}.
+    # Rows of width 1 are points, rows of width 2 are creases and rows of width 3 are facets. IDs are generated on demand from the mesh.
+    def __init__(self, bloom, array):
+        self.bloom = bloom
+        self.array = array
+        self.sorted_keys = None # sorted int64 key of each row, built on the first membership test.
+
+    def element(self, row):
+        if len(row) == 1: return self.bloom.vertex_point_id(row[0])
+        return frozenset(self.bloom.vertex_point_id(vertex) for vertex in row)
+
+    def __iter__(self):
+        for row in self.array.tolist(): yield self.element(row)
+
+    def __len__(self): return len(self.array)
+
+    def row_keys(self, rows): # int64 key of each row of vertex ids, independent of the order of the vertices in the row.
+        keys = np.zeros(len(rows), dtype=np.int64) ; vertex_count = len(self.bloom.vertex_lattice)
+        for column in np.sort(rows, axis=1).T: keys = keys * vertex_count + column
+        return keys
+
+    def __contains__(self, element): # a binary search of the sorted row keys.
+        points = tuple(element) if isinstance(element, frozenset) else (element,)
+        if len(points) != self.array.shape[1] or any(point[2] != 0 for point in points): return False
+        vertices = self.bloom.point_vertex_ids(points)
+        if (vertices < 0).any(): return False
+        if self.sorted_keys is None: self.sorted_keys = np.sort(self.row_keys(self.array))
+        key = self.row_keys(vertices.reshape(1,-1))[0] ; index = np.searchsorted(self.sorted_keys, key)
+        return bool(index < len(self.sorted_keys) and self.sorted_keys[index] == key)
+
+
+class Radial_Set: # a lazy, read-only view of the M radial "mirrors" of one wedge of points, creases or facets.
+    # The wedge holds points p(i,j,0), creases {p1,p2} and facets {p1,p2,p3} of wedge k = 0; its kth mirror is the same element with k in place of 0.
+    # Global points, creases and facets are generated on demand, so memory does not grow with M.
+    def __init__(self, wedge_set, k_sequence):
+        self.wedge_set = wedge_set
+        self.k_sequence = k_sequence
+
+    @staticmethod
+    def mirror(element, k): # returns the kth radial mirror of a point (i,j,k') or of a frozenset of points.
+        if isinstance(element, frozenset): return frozenset((i,j,k) for i,j,_ in element)
+        i,j,_ = element
+        return (i,j,k)
+
+    def __iter__(self):
+        for k in self.k_sequence:
+            for element in self.wedge_set: yield self.mirror(element, k)
+
+    def __len__(self): return len(self.wedge_set) * len(self.k_sequence)
+
+    def __contains__(self, element):
+        points = element if isinstance(element, frozenset) else (element,)
+        k_set = {point[2] for point in points}
+        if len(k_set) != 1 or k_set.pop() not in self.k_sequence: return False # all points of an element belong to the same wedge.
+        return self.mirror(element, 0) in self.wedge_set
+
+
+class Pattern_Cache: # two-level cache of the unit-scale wedge mesh of a pattern, keyed by (M, H): an in-process LRU and optional .npz files on disk.
+    # The scale S and the display options are applied after the cache, so patterns that only differ in them share one entry.
+    version = 1 # part of every key and file name; increase it whenever the cached arrays change meaning.
+    array_names = ("vertex_lattice", "point_coordinates", "crease_array", "crease_type_array", "facet_array", "vertex_crease_indptr", "vertex_crease_indices")
+
+    def __init__(self, max_bytes = 256 * 2**20, cache_dir = None):
+        self.max_bytes = max_bytes # in-process size limit; the least recently used patterns are evicted first.
+        self.cache_dir = cache_dir # directory for .npz files, or None to keep the cache in memory only.
+        self.entries = collections.OrderedDict()
+        self.size_bytes = 0
+
+    def key(self, M, H): return (self.version, M, H)
+
+    def file_name(self, M, H): return os.path.join(self.cache_dir, "yoshimura_v{}_M{}_H{}.npz".format(self.version, M, H))
+
+    def get(self, M, H): # dict of read-only arrays, or None if (M, H) has not been computed.
+        key = self.key(M, H)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.cache_dir and os.path.exists(self.file_name(M, H)):
+            with np.load(self.file_name(M, H)) as npz_file: arrays = {name: npz_file[name] for name in self.array_names}
+            return self.add(key, arrays)
+        return None
+
+    def put(self, M, H, arrays):
+        arrays = self.add(self.key(M, H), {name: np.array(arrays[name]) for name in self.array_names})
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary_file_name = "{}.{}.tmp.npz".format(self.file_name(M, H)[:-4], os.getpid()) # written aside, then renamed, so concurrent processes never read a partial file.
+            np.savez(temporary_file_name, **arrays)
+            os.replace(temporary_file_name, self.file_name(M, H))
+
+    def add(self, key, arrays):
+        for array in arrays.values(): array.flags.writeable = False # shared between patterns
+        if key in self.entries: self.size_bytes -= sum(array.nbytes for array in self.entries.pop(key).values())
+        self.entries[key] = arrays ; self.size_bytes += sum(array.nbytes for array in arrays.values())
+        while self.size_bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted_arrays = self.entries.popitem(last=False)
+            self.size_bytes -= sum(array.nbytes for array in evicted_arrays.values())
+        return arrays
+
+    def clear(self):
+        self.entries.clear() ; self.size_bytes = 0
+
+
+pattern_cache = Pattern_Cache() # shared by all patterns of this process. Set pattern_cache.cache_dir to keep the cache on disk as well.
+
+
+class Stage_Monitor: # times the stages of Bloom_Yoshimura.graph() and compute(), counts elements, and calls user callbacks before and after each stage.
+    # Attach it with bloom.monitor = Stage_Monitor(); a pattern without a monitor runs its stages directly.
+    def __init__(self, trace_memory = False, take_snapshots = False):
+        self.trace_memory = trace_memory # record the bytes allocated by each stage with tracemalloc (slower).
+        self.take_snapshots = take_snapshots # keep a tracemalloc snapshot after each stage in record["snapshot"] (requires trace_memory).
+        self.before_callbacks = collections.defaultdict(list) # stage name (None for every stage) --> callbacks(bloom, stage)
+        self.after_callbacks = collections.defaultdict(list) # stage name (None for every stage) --> callbacks(bloom, stage, record)
+        self.records = list()
+
+    def add_before_callback(self, callback, stage = None): self.before_callbacks[stage].append(callback)
+
+    def add_after_callback(self, callback, stage = None): self.after_callbacks[stage].append(callback)
+
+    def run(self, bloom, method, *arguments):
+        stage = method.__name__
+        for callback in self.before_callbacks[None] + self.before_callbacks[stage]: callback(bloom, stage)
+        is_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if is_tracing: tracemalloc.start()
+        try:
+            if self.trace_memory: tracemalloc.reset_peak() ; start_bytes = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = method(*arguments)
+            record = {"stage": stage, "seconds": time.perf_counter() - start, "M": bloom.M, "H": bloom.H,
+                      "points": len(bloom.point_set), "creases": len(bloom.crease_set), "facets": len(bloom.facet_set)}
+            if self.trace_memory:
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - start_bytes
+                if self.take_snapshots: record["snapshot"] = tracemalloc.take_snapshot()
+        finally:
+            if is_tracing: tracemalloc.stop() # also when the stage raises, e.g. validate_crease_classification.
+        self.records.append(record)
+        for callback in self.after_callbacks[None] + self.after_callbacks[stage]: callback(bloom, stage, record)
+        return result
+
+    def summary(self): # a table of the recorded stages, slowest last.
+        lines = ["{:<45} {:>10} {:>9} {:>9} {:>9} {:>12}".format("stage", "seconds", "points", "creases", "facets", "peak bytes")]
+        for record in sorted(self.records, key=lambda record: record["seconds"]):
+            lines.append("{:<45} {:>10.5f} {:>9} {:>9} {:>9} {:>12}".format(record["stage"], record["seconds"], record["points"], record["creases"], record["facets"], record.get("peak_bytes", "")))
+        lines.append("{:<45} {:>10.5f}".format("total", sum(record["seconds"] for record in self.records)))
+        return "\n".join(lines)
+
+    def print_summary(self): print(self.summary())
+
+    def to_json(self): return json.dumps([{key: value for key, value in record.items() if key != "snapshot"} for record in self.records], indent=1)
+
+    def dump_json(self, file_name):
+        with open(file_name, "w") as file: file.write(self.to_json())
+
+    def clear(self): self.records.clear()
 
 
 class Bloom_Yoshimura:
+    # fold types of the crease_type_array
+    EDGE = 0 ; ORTHOGONAL_CREASE = 1 ; DIAGONAL_CREASE = 2 ; MISCLASSIFIED_CREASE = -1
+
     def __init__(self, M, H, S):
         """ input variables """
-        self.M = M ; self.H = H ; self.S = S
+        self._M = M ; self._H = H ; self._S = S # M, H and S are properties: changing them invalidates the geometry.
         """ variables for computation: """
+        # One wedge (k = 0) is stored as an integer mesh. Vertex v has the doubled lattice coordinates (2i, 2j), so half-length points are integers too.
+        # Vertex ids are contiguous: full-length points row by row (j, then i), then half-length points (c). The other wedges are rotations of it.
+        self.vertex_lattice = np.empty((0,2), dtype=np.int32) # (N,2) array of doubled lattice coordinates (2i,2j), one row per vertex.
+        self.point_coordinates = np.empty((0,2)) # (N,2) array of point coordinates (x,y) of one wedge, one row per vertex.
+        self.affine_matrix = np.identity(3) # pending wedge transformation in homogeneous coordinates.
+        self.crease_array = np.empty((0,2), dtype=np.int32) # (E,2) array of the two vertices of each crease.
+        self.crease_type_array = np.empty(0, dtype=np.int8) # (E,) fold type of each crease: EDGE, ORTHOGONAL_CREASE or DIAGONAL_CREASE.
+        self.facet_array = np.empty((0,3), dtype=np.int32) # (F,3) array of the three vertices of each facet.
+        self.vertex_crease_indptr = np.zeros(1, dtype=np.int32) # CSR adjacency: the creases of vertex v are vertex_crease_indices[indptr[v]:indptr[v+1]].
+        self.vertex_crease_indices = np.empty(0, dtype=np.int32)
+        # lazy views of the mesh as point IDs p(i,j,k), creases {p1,p2} and facets {p1,p2,p3}:
         self.point_set = set()
-        self.point_map = dict()
         self.crease_set = set()
         self.edge_set = set()
         self.orthogonal_crease_set = set()
         self.diagonal_crease_set = set()
-        self.transformed_point_set = set()
         self.facet_set = set()
         """ numerical values for computation: """
-        self.alpha_angle = 2 * np.pi / self.M # alpha = 2pi/M
-        self.height_length = 1/(2*np.tan(self.alpha_angle/2)) # h = 1 / 2tan(alpha/2)
-        self.big_alpha_sequence = tuple(self.alpha_angle * np.array(range(0,self.M)))
-        self.k_sequence = tuple(range(0,self.M)) # k = {0,1,...,M-1}
-        self.j_sequence = tuple(range(0,self.H+1)) # j = {0,1,...,H}
-        self.c_sequence = tuple(range(0,self.H)) # c = {0,1,...,H-1}
+        self.define_numerical_values()
         """ variables for plotting: """
         self.plot_origin = bool()
         self.plot_points = bool()
         self.plot_facets = bool()
         self.plot_lines = bool()
+        self.point_label_limit = 1000 # largest number of point labels (i,j,k) drawn at once. Zoom in to label the points of a larger pattern.
+        self.label_one_wedge = False # if True, only the points of wedge 0 are labelled.
         self.line_style = 1
         self.line_width = 1 # default line_width
         self.crease_is_invert = False # Boolean Value
+        self.output_file = None # if a file name is given, e.g. "Y6-2.svg", the plot is saved to it instead of being shown in a window.
+        """ variables for caching: """
+        self.cache = pattern_cache # set to None to always compute the pattern from scratch.
+        """ variables for instrumentation: """
+        self.monitor = None # a Stage_Monitor to time the stages of graph() and compute(), or None.
+        """ variables for incremental evaluation: """
+        self.computed_parameters = None # (M, H, S) of the computed geometry, or None if it has to be computed.
+        self.artists = dict() # layer name --> matplotlib artists of the last plot, which update_plot restyles in place.
+        self.artist_parameters = None # (M, H, S) of the geometry the artists were drawn from.
+        self.point_label_callbacks = list() # ids of the callbacks that label the points in view when the view of the plot changes.
+
+    def define_numerical_values(self):
+        self.alpha_angle = 2 * np.pi / self.M # alpha = 2pi/M
+        self.height_length = 1/(2*np.tan(self.alpha_angle/2)) # h = 1 / 2tan(alpha/2)
+        self.big_alpha_sequence = tuple(self.alpha_angle * np.array(range(0,self.M)))
+        self.k_sequence = tuple(range(0,self.M)) # k = {0,1,...,M-1}
+        self.j_sequence = tuple(range(0,self.H+1)) # j = {0,1,...,H}
+        self.c_sequence = tuple(range(0,self.H)) # c = {0,1,...,H-1}
+        self.rotation_matrix_array = np.tile(np.identity(2), (self.M,1,1)) # (M,2,2) array: the kth matrix maps wedge 0 onto wedge k. Identity until the rotation is computed.
+
+    @property
+    def M(self): return self._M
+
+    @M.setter
+    def M(self, M): self._M = M ; self.define_numerical_values() ; self.computed_parameters = None
+
+    @property
+    def H(self): return self._H
+
+    @H.setter
+    def H(self, H): self._H = H ; self.define_numerical_values() ; self.computed_parameters = None
+
+    @property
+    def S(self): return self._S
+
+    @S.setter
+    def S(self, S): self._S = S ; self.computed_parameters = None
 
     def graph(self):
-        """ initialization: """
-        self.define_point_set()
-        self.point_map_initialize()
-        self.define_crease_set()
-        self.define_facet_set()
+        stage = self.run_stage
+        self.compute()
+        if self.has_current_plot(): stage(self.update_plot) # only display options changed: the artists are restyled in place.
+        else:
+            self.clear_plot()
+            self.artist_parameters = (self.M, self.H, self.S)
+            """ plotting: """
+            if self.plot_origin: stage(self.plot_origin_point)
+            if self.plot_points: stage(self.plot_point_set)
+            if self.plot_lines:
+                if self.line_style: stage(self.plot_colored_crease_set)
+                else: stage(self.plot_monochromatic_crease_set)
+            if self.plot_facets: stage(self.plot_facet_set)
+        stage(self.show_plot)
+
+    def compute(self): # computes the points, creases and facets of the whole pattern, without plotting.
+        if self.computed_parameters == (self.M, self.H, self.S): return # the geometry is only computed again after M, H or S change.
+        stage = self.run_stage
+        if not stage(self.load_cached_wedge):
+            """ initialization: """
+            stage(self.define_point_set)
+            stage(self.point_map_initialize)
+            stage(self.define_crease_set)
+            stage(self.define_facet_set)
+            """ classification: """
+            stage(self.classify_crease)
+            """ unit-scale transformations: """
+            stage(self.slant_linear_transformation)
+            stage(self.translation_transformation)
+            stage(self.apply_affine_transformation)
+            stage(self.store_cached_wedge)
         """ computation of transformations: """
-        self.slant_linear_transformation()
-        self.translation_transformation()
-        self.scale_linear_transformation()
-        self.define_point_radial_duplicates()
-        self.define_crease_radial_duplicates()
-        self.define_facet_radial_duplicates()
-        self.sequential_rotation_linear_transformation()
-        """ plotting: """
-        if self.plot_origin: self.plot_origin_point()
-        if self.plot_points: self.plot_point_set()
-        self.classify_crease()
-        if self.plot_lines:
-            if self.line_style: self.plot_colored_crease_set()
-            else: self.plot_monochromatic_crease_set()
-        if self.plot_facets: self.plot_facet_set()
-        self.show_plot()
+        stage(self.scale_linear_transformation) # the scale is applied last, so the cached wedge does not depend on S.
+        stage(self.define_point_radial_duplicates)
+        stage(self.define_crease_radial_duplicates)
+        stage(self.define_facet_radial_duplicates)
+        stage(self.sequential_rotation_linear_transformation)
+        self.computed_parameters = (self.M, self.H, self.S)
+
+    def run_stage(self, method, *arguments): # runs one stage, through the monitor if there is one.
+        if self.monitor is None: return method(*arguments)
+        return self.monitor.run(self, method, *arguments)
+
+    '''CACHING'''
+    def load_cached_wedge(self): # restores the unit-scale wedge mesh of (M, H) from the cache. Returns False if it is not cached.
+        arrays = self.cache.get(self.M, self.H) if self.cache is not None else None
+        if arrays is None: return False
+        for name in Pattern_Cache.array_names: setattr(self, name, arrays[name])
+        self.point_coordinates = self.point_coordinates.copy() # the only array that is transformed in place.
+        self.affine_matrix = np.identity(3)
+        self.point_set = Wedge_View(self, np.arange(len(self.vertex_lattice), dtype=np.int32).reshape(-1,1))
+        self.crease_set = Wedge_View(self, self.crease_array)
+        self.facet_set = Wedge_View(self, self.facet_array)
+        self.define_classified_crease_sets()
+        return True
+
+    def store_cached_wedge(self):
+        if self.cache is not None: self.cache.put(self.M, self.H, {name: getattr(self, name) for name in Pattern_Cache.array_names})
 
 
     '''DEFINING THE MODEL'''
     '''DEFINING POINTS'''
     def define_point_set(self):
+        self.vertex_lattice = np.empty((0,2), dtype=np.int32)
         self.define_full_length_point_set()
         self.define_half_length_point_set()
+        self.point_set = Wedge_View(self, np.arange(len(self.vertex_lattice), dtype=np.int32).reshape(-1,1))
 
     def define_full_length_point_set(self): # p(i,j,k) = ({0,1,...,H+1-j},j, not_assigned), j = {0,1,...,H}
         H = self.H
-        j_sequence = self.j_sequence
-        full_length_point_set = set()
-        for j in j_sequence:
-            i_sequence = tuple(range(0,H+2-j)) # i = {0,1,...,H+1-j}
-            for i in i_sequence:
-                full_length_point = tuple([i,j, 0])
-                full_length_point_set.add(full_length_point)
-        self.point_set = self.point_set.union(full_length_point_set)
+        j_array = np.repeat(np.array(self.j_sequence, dtype=np.int32), H+2-np.array(self.j_sequence, dtype=np.int32)) # row j holds H+2-j points
+        i_array = np.arange(len(j_array), dtype=np.int32) - self.full_length_row_offset(j_array) # i = {0,1,...,H+1-j}
+        self.vertex_lattice = np.concatenate((self.vertex_lattice, 2*np.column_stack((i_array, j_array))))
 
     def define_half_length_point_set(self): # p(i,j,k) = (H+1/2-c, 1/2+c, not_assigned), c = {0,1,...,H-1}
-        H = self.H ; c_sequence = self.c_sequence ; half_length_point_set = set()
-        for c in c_sequence:
-            half_length_point = tuple([H+1/2-c, 1/2+c, 0])
-            half_length_point_set.add(half_length_point)
-        self.point_set = self.point_set.union(half_length_point_set)
-    
-    def point_map_initialize(self): # Maps the ID of a point p(i,j,k) to its numerical value (i',j'), to prepare for linear transformations.
-        point_set = self.point_set
-        for point_id in point_set: self.point_map[point_id] = point_id[:2]  # p(i,j,k) = (i',j')
+        H = self.H ; c_array = np.array(self.c_sequence, dtype=np.int32)
+        self.vertex_lattice = np.concatenate((self.vertex_lattice, np.column_stack((2*H+1-2*c_array, 1+2*c_array)).astype(np.int32)))
+
+    def full_length_row_offset(self, j): return j*(self.H+2) - j*(j-1)//2 # vertex id of the full-length point (0,j)
+
+    def lattice_vertex_ids(self, lattice): # vertex ids of an (n,2) array of doubled lattice coordinates (2i,2j), or -1 where there is no vertex.
+        H = self.H ; full_length_point_count = (H+1)*(H+4)//2
+        I, J = np.asarray(lattice, dtype=np.int64).reshape(-1,2).T
+        i, j, c = I//2, J//2, (J-1)//2
+        is_full_length = (I%2 == 0) & (J%2 == 0) & (j >= 0) & (j <= H) & (i >= 0) & (i <= H+1-j)
+        is_half_length = (I%2 == 1) & (J%2 == 1) & (c >= 0) & (c < H) & (I+J == 2*H+2)
+        vertex_ids = np.where(is_full_length, self.full_length_row_offset(j) + i, np.where(is_half_length, full_length_point_count + c, -1))
+        return vertex_ids.astype(np.int32)
+
+    def point_vertex_ids(self, point_ids): # vertex ids of points p(i,j,k) in wedge 0, or -1 where i or j is not a multiple of 1/2, e.g. (1.2,0,0).
+        lattice = 2 * np.array([(i,j) for i,j,k in point_ids], dtype=float).reshape(-1,2)
+        is_lattice = (lattice == np.round(lattice)).all(axis=1)
+        return np.where(is_lattice, self.lattice_vertex_ids(np.where(is_lattice[:, np.newaxis], lattice, -1)), -1).astype(np.int32)
+
+    def vertex_point_id(self, vertex): # point ID p(i,j,0) of a vertex; lattice points are ints and half-length points are floats, as in define_point_set.
+        I, J = self.vertex_lattice[vertex].tolist()
+        return (I//2 if I%2 == 0 else I/2, J//2 if J%2 == 0 else J/2, 0)
+
+    def point_map_initialize(self): # Maps each vertex to its numerical value (i',j'), to prepare for linear transformations.
+        self.point_coordinates = self.vertex_lattice / 2 # p(i,j,k) = (i',j')
+        self.affine_matrix = np.identity(3)
+
+    def point_map_read(self, point_id): return tuple(self.global_coordinates((point_id,))[0])
 
-    def point_map_read(self, point_id): return self.point_map[point_id]
+    def point_map_update(self, point_id, new_value): # moves the point p(i,j,k) and, by symmetry, its radial "mirrors" in every other wedge.
+        k = point_id[2]
+        self.point_coordinates[self.point_vertex_ids((point_id,))[0]] = np.dot(self.rotation_matrix_array[k].T, new_value)
 
-    def point_map_update(self, point_id, new_value): self.point_map[point_id] = new_value
+    def global_coordinates(self, point_ids): # (n,2) array of the coordinates of the points p(i,j,k), rotated from wedge 0 to wedge k.
+        vertex_ids = self.point_vertex_ids(point_ids)
+        if (vertex_ids < 0).any(): raise KeyError("not a point of the pattern: {}".format(point_ids[int(np.argmin(vertex_ids))]))
+        k_array = [k for i,j,k in point_ids]
+        return np.einsum("nab,nb->na", self.rotation_matrix_array[k_array], self.point_coordinates[vertex_ids]).reshape(-1,2)
 
-    def define_point_radial_duplicates(self): # expands both point_map and point_set to include radial "mirrors" of a wedge of points.
-        point_set = self.point_set ; k_sequence = self.k_sequence ; duplicate_point_set = set()
-        for point_id in point_set:
-            point_coordinates = self.point_map_read(point_id)
-            for k in k_sequence:
-                kth_radial_duplicate = tuple([point_id[0], point_id[1], k])
-                duplicate_point_set.add(kth_radial_duplicate)
-                self.point_map_update(kth_radial_duplicate, point_coordinates)
-        self.point_set = duplicate_point_set
+    def radial_coordinates(self, wedge_coordinates): # (M,...,2) array of the radial "mirrors" of an array (...,2) of coordinates in wedge 0, one for each k.
+        return np.einsum("kab,...b->k...a", self.rotation_matrix_array, wedge_coordinates)
+
+    def define_point_radial_duplicates(self): # expands point_set to include radial "mirrors" of a wedge of points, as a lazy view of the wedge.
+        self.point_set = Radial_Set(self.point_set, self.k_sequence)
 
     '''DEFINING LINES'''
     def define_crease_set(self): # this function defines a set of creases of only one wedge of the pattern.
-        point_set = self.point_set
-        crease_set = set()
-        for point_id in point_set:
-            i,j,k = point_id[0],point_id[1],0
-            potential_creases = [(i+1,j+1,k), (i+1,j,k), (i,j+1,k), (i+.5,j+.5,k), (i-.5,j+.5,k), (i+.5,j-.5,k)] #diagonal_points, horizontal_points, vertical_points, half_length_points A, B, and C
-            for potential_crease in potential_creases:
-                if potential_crease in point_set:
-                    crease_set.add(frozenset({point_id,potential_crease})) # An crease (line segment) is defined as A––B = B––A, or {A,B} = {B,A}, where A and B are points.
-        self.crease_set = crease_set
-
-    def classify_crease(self): # three categories: diagonal crease, orthogonal crease, and edge. Can be used before OR after radial duplication.
-        crease_set = self.crease_set
-        H = self.H
-        edge_set = set()
-        orthogonal_crease_set = set()
-        diagonal_crease_set = set()
-        for crease in crease_set:
-            (i,j,k),(i2,j2,k2) = crease # (i,j,k) and (i",j",k") are points in point_set
-            if i2+j2==i+j: # implies either i"=i-.5,j"=j+.5 or i"=i+.5,j"=j-.5, which means the crease is a negative diagonal EDGE.
-                edge_set.add(crease)
-            elif j==H and j2==H: # means both points are vertices of an EDGE on top of the pattern.
-                edge_set.add(crease)
-            elif j==j2 and abs(i-i2)==1: # j=j" means the points are HORIZONTAL and |i-i"|=1 means they are one unit apart.
-                orthogonal_crease_set.add(crease)
-            elif i==i2 and abs(j-j2)==1: # i=i" means the points are VERTICAL and |j-j"|=1 means they are one unit apart.
-                orthogonal_crease_set.add(crease)
-            elif abs(i+j-i2-j2)==2: # |i+j-i"-j"|=2 means if two points are DIAGONAL and two taxi block units apart.
-                diagonal_crease_set.add(crease)
-            elif abs(i+j-i2-j2)==1 and abs(i-i2)==.5 and abs(j-j2)==.5: # if |i+j-i"-j"|=1, |i-i"|=.5 and |j-j"|=.5 , the two points are DIAGONAL and only half taxi-block-unit apart.
-                diagonal_crease_set.add(crease)
-            else:
-                print("ERROR: misclassified crease")
-        self.edge_set = edge_set
-        self.orthogonal_crease_set = orthogonal_crease_set
-        self.diagonal_crease_set = diagonal_crease_set
-
-    def invert_crease_mountain_valley_assignment(self): # inverts crease mountain/valley assignment
+        vertex_lattice = self.vertex_lattice ; vertex_ids = np.arange(len(vertex_lattice), dtype=np.int32)
+        potential_crease_offsets = ((2,2), (2,0), (0,2), (1,1), (-1,1), (1,-1)) # doubled offsets of diagonal_points, horizontal_points, vertical_points, half_length_points A, B, and C
+        crease_list = list()
+        for offset in potential_crease_offsets:
+            neighbor_ids = self.lattice_vertex_ids(vertex_lattice + offset)
+            is_crease = neighbor_ids >= 0
+            crease_list.append(np.column_stack((vertex_ids[is_crease], neighbor_ids[is_crease])))
+        crease_array = np.sort(np.concatenate(crease_list), axis=1) # An crease (line segment) is defined as A––B = B––A, so it is stored as (min, max).
+        self.crease_array = np.unique(crease_array, axis=0).astype(np.int32).reshape(-1,2)
+        self.define_vertex_crease_adjacency()
+        self.crease_set = Wedge_View(self, self.crease_array)
+
+    def define_vertex_crease_adjacency(self): # CSR adjacency from each vertex to the creases it belongs to.
+        vertex_count = len(self.vertex_lattice) ; crease_ends = self.crease_array.ravel()
+        order = np.argsort(crease_ends, kind="stable")
+        self.vertex_crease_indptr = np.concatenate(([0], np.cumsum(np.bincount(crease_ends, minlength=vertex_count)))).astype(np.int32)
+        self.vertex_crease_indices = (order // 2).astype(np.int32) # crease id of each (vertex, crease) incidence
+
+    def classify_crease(self): # three categories: diagonal crease, orthogonal crease, and edge. All wedges are classified alike, so only wedge 0 is classified.
+        H2 = 2*self.H # in doubled lattice coordinates
+        (I, J), (I2, J2) = self.vertex_lattice[self.crease_array[:,0]].T, self.vertex_lattice[self.crease_array[:,1]].T # (i,j,k) and (i",j",k") are points in point_set
+        conditions = (I2+J2 == I+J, # implies either i"=i-.5,j"=j+.5 or i"=i+.5,j"=j-.5, which means the crease is a negative diagonal EDGE.
+                      (J == H2) & (J2 == H2), # means both points are vertices of an EDGE on top of the pattern.
+                      (J == J2) & (abs(I-I2) == 2), # j=j" means the points are HORIZONTAL and |i-i"|=1 means they are one unit apart.
+                      (I == I2) & (abs(J-J2) == 2), # i=i" means the points are VERTICAL and |j-j"|=1 means they are one unit apart.
+                      abs(I+J-I2-J2) == 4, # |i+j-i"-j"|=2 means if two points are DIAGONAL and two taxi block units apart.
+                      (abs(I+J-I2-J2) == 2) & (abs(I-I2) == 1) & (abs(J-J2) == 1)) # if |i+j-i"-j"|=1, |i-i"|=.5 and |j-j"|=.5 , the two points are DIAGONAL and only half taxi-block-unit apart.
+        choices = (self.EDGE, self.EDGE, self.ORTHOGONAL_CREASE, self.ORTHOGONAL_CREASE, self.DIAGONAL_CREASE, self.DIAGONAL_CREASE)
+        self.crease_type_array = np.select(conditions, choices, default=self.MISCLASSIFIED_CREASE).astype(np.int8)
+        self.validate_crease_classification()
+        self.define_classified_crease_sets()
+
+    def define_classified_crease_sets(self): # views of the edges, orthogonal creases and diagonal creases, radially duplicated if the crease set is.
+        crease_type_array = self.crease_type_array
+        self.edge_set = Wedge_View(self, self.crease_array[crease_type_array == self.EDGE])
+        self.orthogonal_crease_set = Wedge_View(self, self.crease_array[crease_type_array == self.ORTHOGONAL_CREASE])
+        self.diagonal_crease_set = Wedge_View(self, self.crease_array[crease_type_array == self.DIAGONAL_CREASE])
+        if isinstance(self.crease_set, Radial_Set): self.define_classified_crease_radial_duplicates()
+
+    def define_classified_crease_radial_duplicates(self):
+        self.edge_set = Radial_Set(self.edge_set, self.k_sequence)
+        self.orthogonal_crease_set = Radial_Set(self.orthogonal_crease_set, self.k_sequence)
+        self.diagonal_crease_set = Radial_Set(self.diagonal_crease_set, self.k_sequence)
+
+    def validate_crease_classification(self): # every crease must be an edge, an orthogonal crease or a diagonal crease.
+        misclassified = np.flatnonzero(self.crease_type_array == self.MISCLASSIFIED_CREASE)
+        if len(misclassified):
+            creases = [sorted(self.vertex_point_id(vertex) for vertex in self.crease_array[row]) for row in misclassified[:5]]
+            raise ValueError("misclassified creases ({} in total), e.g. {}".format(len(misclassified), creases))
+
+    def invert_crease_mountain_valley_assignment(self): # inverts crease mountain/valley assignment, and recolors the creases of the current plot.
             crease_is_invert = self.crease_is_invert
             self.crease_is_invert = not crease_is_invert
+            if self.has_current_plot(): self.update_plot()
+
+    def mountain_valley_crease_sets(self): # returns (mountain folds, valley folds). Diagonal creases are mountain folds and orthogonal creases are valley folds, unless crease_is_invert is True.
+        if not self.crease_is_invert: return self.diagonal_crease_set, self.orthogonal_crease_set
+        return self.orthogonal_crease_set, self.diagonal_crease_set
 
-    def define_crease_radial_duplicates(self): # expands crease set to include radial "mirrors" of a wedge of creases.
-        crease_set = self.crease_set
-        duplicate_crease_set = set()
-        k_sequence = self.k_sequence
-        for crease in crease_set:
-            (i1,j1,k1),(i2,j2,k2) = crease
-            for k in k_sequence:
-                duplicate_crease = frozenset({(i1,j1,k),(i2,j2,k)})
-                duplicate_crease_set.add(duplicate_crease)
-        self.crease_set = duplicate_crease_set
+    def define_crease_radial_duplicates(self): # expands crease set to include radial "mirrors" of a wedge of creases, as a lazy view of the wedge.
+        self.crease_set = Radial_Set(self.crease_set, self.k_sequence)
+        self.define_classified_crease_radial_duplicates()
 
     '''DEFINING facetS'''
-    def define_facet_set(self):
-        facet_set = self.facet_set
-        search_crease_set = self.crease_set
-        for crease in search_crease_set: # before radial duplication
-            p1,p2 = crease
-            # Search the crease set for two other lines that satisfy {p1,p2},{p2,p3},{p1,p3}.
-            for crease_2 in search_crease_set:
-                p3,p4 = crease_2
-                if p1==p3:
-                    crease_3 = {p2,p4}
-                    if crease_3 in search_crease_set:
-                        facet = frozenset({p1,p2,p4})
-                        facet_set.add(facet)
-        self.facet_set = facet_set
-
-    def define_facet_radial_duplicates(self):
-        facet_set = self.facet_set
-        duplicate_facet_set = set()
-        k_sequence = self.k_sequence
-        for facet in facet_set:
-            (i1,j1,k1),(i2,j2,k2),(i3,j3,k3) = facet
-            for k in k_sequence:
-                duplicate_facet = frozenset({(i1,j1,k),(i2,j2,k),(i3,j3,k)})
-                duplicate_facet_set.add(duplicate_facet)
-        self.facet_set = duplicate_facet_set
+    def define_facet_set(self): # a facet is a triangle {p1,p2,p3} of the crease graph, i.e. {p1,p2},{p2,p3},{p1,p3} are all creases.
+        vertex_count = len(self.vertex_lattice) ; crease_array = self.crease_array
+        indptr, indices = self.vertex_crease_indptr, self.vertex_crease_indices
+        degrees = np.diff(indptr) ; max_degree = int(degrees.max(initial=0))
+        # (N, max_degree) table of the neighbors of each vertex, padded with -1.
+        incidence_vertices = np.repeat(np.arange(vertex_count), degrees)
+        neighbors = np.where(crease_array[indices, 0] == incidence_vertices, crease_array[indices, 1], crease_array[indices, 0])
+        neighbor_table = np.full((vertex_count, max_degree), -1, dtype=np.int32)
+        neighbor_table[incidence_vertices, np.arange(len(indices)) - indptr[incidence_vertices]] = neighbors
+        # each facet is found once, from its smallest vertex p1 with neighbors p1 < p2 < p3, when {p2,p3} is a crease.
+        a, b = np.triu_indices(max_degree, k=1)
+        p1 = np.repeat(np.arange(vertex_count, dtype=np.int32), len(a)) ; p2 = neighbor_table[:, a].ravel() ; p3 = neighbor_table[:, b].ravel()
+        p2, p3 = np.minimum(p2, p3), np.maximum(p2, p3)
+        is_candidate = (p2 > p1) & (p3 > p2)
+        p1, p2, p3 = p1[is_candidate], p2[is_candidate], p3[is_candidate]
+        crease_keys = crease_array[:,0].astype(np.int64) * vertex_count + crease_array[:,1]
+        is_facet = np.isin(p2.astype(np.int64) * vertex_count + p3, crease_keys)
+        self.facet_array = np.column_stack((p1[is_facet], p2[is_facet], p3[is_facet])).astype(np.int32).reshape(-1,3)
+        self.facet_set = Wedge_View(self, self.facet_array)
+
+    def define_facet_radial_duplicates(self): # expands facet set to include radial "mirrors" of a wedge of facets, as a lazy view of the wedge.
+        self.facet_set = Radial_Set(self.facet_set, self.k_sequence)
 
 
     '''GRAPHING THE MODEL'''
     '''TRANSFORMATIONS'''
+    # The slant, translation and scale transformations are composed into a single affine matrix (homogeneous coordinates),
+    # which is applied to the points of one wedge in apply_affine_transformation. The other wedges are rotations of it.
+    def compose_affine_transformation(self, matrix): self.affine_matrix = np.dot(matrix, self.affine_matrix) # the new transformation is applied after the pending ones.
+
     def slant_linear_transformation(self): # this function inputs a set of vectors and the angle to slant them around the x axis (i-hat remains unchanged, j-hat axis slants, both i-hat and j-hat are not scaled).
-        point_set = self.point_set
         angle = self.alpha_angle
-        slant_matrix = tuple([[1, np.cos(angle)],
-                              [0, np.sin(angle)]])
-        transformed_point_set = set()
-        for point_id in point_set:
-            point = self.point_map_read(point_id)
-            transformed_point = np.dot(slant_matrix, point) # matrix-vector multiplication
-            transformed_point = tuple(transformed_point)
-            transformed_point_set.add(transformed_point)
-            self.point_map_update(point_id, transformed_point)
-        self.transformed_point_set = transformed_point_set
+        slant_matrix = np.array([[1, np.cos(angle), 0],
+                                 [0, np.sin(angle), 0],
+                                 [0, 0, 1]])
+        self.compose_affine_transformation(slant_matrix)
 
     def translation_transformation(self): # this function inputs change in (x and y) direction and translates all coordinates by that direction.
-        point_set = self.point_set ; delta_x = -0.5 ; delta_y = self.height_length
-        translation_point = tuple([delta_x,delta_y]) ; transformed_point_set = set()
-        for point_id in point_set:
-            point = self.point_map_read(point_id)
-            transformed_point = np.add(point, translation_point) # vector addition
-            transformed_point = tuple(transformed_point)
-            transformed_point_set.add(transformed_point)
-            self.point_map_update(point_id, transformed_point)
-        self.transformed_point_set = transformed_point_set
+        delta_x = -0.5 ; delta_y = self.height_length
+        translation_matrix = np.array([[1, 0, delta_x],
+                                       [0, 1, delta_y],
+                                       [0, 0, 1]])
+        self.compose_affine_transformation(translation_matrix)
 
     def scale_linear_transformation(self): # this function inputs a scale factor and scales all coordinates by that factor.
-        point_set = self.point_set ; scale_factor = self.S ; transformed_point_set = set()
-        for point_id in point_set:
-            point = self.point_map_read(point_id)
-            point = np.array(point)
-            transformed_point = scale_factor * point # scalar vector multiplication
-            transformed_point = tuple(transformed_point)
-            transformed_point_set.add(transformed_point)
-            self.point_map_update(point_id, transformed_point)
-        self.transformed_point_set = transformed_point_set
-
-    def sequential_rotation_linear_transformation(self): # this function inputs a set of vectors and the angle to rotate them counterclockwise around the origin.
-        point_set = self.point_set
-        alpha_angle = self.alpha_angle
-        k_sequence = self.k_sequence
-        transformed_point_set = set()
-        for k in k_sequence:
-            angle = alpha_angle * k
-            rotation_matrix = tuple([[np.cos(angle), -np.sin(angle)],[np.sin(angle), np.cos(angle)]])
-            for point_id in point_set:
-                if point_id[2] == k:
-                    point = self.point_map_read(point_id)
-                    transformed_point = np.dot(rotation_matrix, point) # matrix-vector multiplication --> vector rotation
-                    transformed_point = tuple(transformed_point)
-                    transformed_point_set.add(transformed_point)
-                    self.point_map_update(point_id, transformed_point)
-        self.transformed_point_set = transformed_point_set
+        scale_factor = self.S
+        scale_matrix = np.diag([scale_factor, scale_factor, 1])
+        self.compose_affine_transformation(scale_matrix)
+
+    def rotation_matrices(self): # (M,2,2) array of counterclockwise rotations around the origin by the angles alpha*k, k = {0,1,...,M-1}.
+        big_alpha_sequence = np.array(self.big_alpha_sequence)
+        cos, sin = np.cos(big_alpha_sequence), np.sin(big_alpha_sequence)
+        return np.stack((np.stack((cos, -sin), axis=-1), np.stack((sin, cos), axis=-1)), axis=-2)
+
+    def apply_affine_transformation(self): # applies the pending affine transformation to the points of wedge 0.
+        homogeneous_points = np.column_stack((self.point_coordinates, np.ones(len(self.point_coordinates))))
+        self.point_coordinates = np.dot(homogeneous_points, self.affine_matrix.T)[:, :2] # batched matrix-vector multiplication
+        self.affine_matrix = np.identity(3)
+
+    def sequential_rotation_linear_transformation(self): # this function applies the pending affine transformation to wedge 0, and sets the rotation of wedge k counterclockwise around the origin by the angle alpha*k.
+        self.apply_affine_transformation()
+        self.rotation_matrix_array = self.rotation_matrices()
 
     '''PLOTTING'''
-    def plot_origin_point(self): plt.plot(0, 0, "*", color = "green")
+    def pyplot(self): return pyplot(headless = bool(self.output_file)) # a plot saved to output_file needs no window.
 
+    def plot_origin_point(self): self.artists["origin"] = self.pyplot().plot(0, 0, "*", color = "green")
+
+    # All points are drawn as one scatter collection. Labels (i,j,k) are only drawn for the points inside the current view, and only if there are
+    # at most point_label_limit of them; they are drawn again whenever the view changes (zooming or panning).
     def plot_point_set(self):
-        graph = plt.subplot() ; point_map = self.point_map ; s = self.S
-        x, y = zip(*point_map.values())
-        for point in self.point_map.keys():
-            i, j, k = point ; i2, j2 = self.point_map_read(point) ; shift = int()
+        graph = self.pyplot().subplot()
+        point_coordinates = self.radial_coordinates(self.point_coordinates).reshape(-1,2) # point k*N + v is p(i,j,k) of vertex v.
+        self.artists["points"] = [graph.scatter(point_coordinates[:, 0], point_coordinates[:, 1], s = 36, color = "gray", zorder = 2)]
+        self.artists["point_labels"] = list()
+        self.point_label_callbacks = [graph.callbacks.connect(limit, self.update_point_labels) for limit in ("xlim_changed", "ylim_changed")]
+        self.update_point_labels(graph)
+        graph.set_aspect("equal")
+
+    def update_point_labels(self, graph): # labels the points inside the view of graph, up to point_label_limit labels.
+        (x_min, x_max), (y_min, y_max) = sorted(graph.get_xlim()), sorted(graph.get_ylim()) # first, as reading a pending view fits it and calls this function.
+        for label in self.artists.get("point_labels", ()): label.remove()
+        labels = self.artists["point_labels"] = list()
+        if not self.artists["points"][0].get_visible(): return
+        s = self.S ; vertex_count = len(self.point_coordinates)
+        point_coordinates = self.artists["points"][0].get_offsets()
+        if self.label_one_wedge: point_coordinates = point_coordinates[:vertex_count]
+        in_view = np.flatnonzero((point_coordinates[:, 0] >= x_min) & (point_coordinates[:, 0] <= x_max) & (point_coordinates[:, 1] >= y_min) & (point_coordinates[:, 1] <= y_max))
+        if len(in_view) > self.point_label_limit: return
+        for point, (i2, j2) in zip(in_view, point_coordinates[in_view]):
+            k, vertex = divmod(int(point), vertex_count)
+            i, j, _ = self.vertex_point_id(vertex) ; shift = int()
             if i == 0: shift = 0.1
             elif j == 0: shift = -0.1
             else: shift = +0.1
-            plt.text(i2 - 0.2*s, j2 + s*(-0.04 + shift), '({},{},{})'.format(i, j, k), fontsize = 6, fontweight = 1000)
-        plt.plot(x, y, "o", color = "gray")
-        graph.set_aspect("equal")
+            labels.append(graph.text(i2 - 0.2*s, j2 + s*(-0.04 + shift), '({},{},{})'.format(i, j, k), fontsize = 6, fontweight = 1000))
     
-    def set_line_width(self, new_width): self.line_width = new_width
-
-    def plot_crease_set(self):
-        graph = plt.subplot()
-        point_map = self.point_map
-        x,y = zip(*point_map.values())
-        crease_set = self.crease_set
-        for crease in crease_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "blue")
-        graph.set_aspect("equal")
+    def set_line_width(self, new_width): # sets the line width, and applies it to the current plot.
+        self.line_width = new_width
+        if self.has_current_plot(): self.update_plot()
 
-    def plot_colored_crease_set(self): # if crease_is_invert is True, then switch between mountain/valley assignment.
-        crease_is_invert = self.crease_is_invert ; line_width = self.line_width
-        graph = plt.subplot() ; point_map = self.point_map
-        x,y = zip(*point_map.values())
-        edge_set = self.edge_set ; orthogonal_crease_set = self.orthogonal_crease_set ; diagonal_crease_set = self.diagonal_crease_set
-        colors = ("black", "red", "blue") # Blue creases are mountain folds, Red creases are valley folds, Black lines are edges.
-        for crease in edge_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "black", linewidth = line_width)
-        for crease in orthogonal_crease_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "red" if not crease_is_invert else "blue", linewidth = line_width)
-        for crease in diagonal_crease_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "blue" if not crease_is_invert else "red", linewidth = line_width)
+    # Each class of lines is drawn as a single LineCollection and all facets as a single PolyCollection,
+    # so the number of artists does not grow with the size of the pattern.
+    def crease_segments(self, crease_set): # (E,2,2) array of the coordinates of the two end points of each crease.
+        if isinstance(crease_set, Radial_Set): # one wedge is looked up and then rotated into every wedge.
+            return self.radial_coordinates(self.crease_segments(crease_set.wedge_set)).reshape(-1,2,2)
+        if isinstance(crease_set, Wedge_View): return self.point_coordinates[crease_set.array]
+        return self.global_coordinates([point_id for crease in crease_set for point_id in crease]).reshape(-1,2,2)
+
+    def facet_polygons(self, facet_set): # (F,3,2) array of the coordinates of the three vertices of each facet.
+        if isinstance(facet_set, Radial_Set):
+            return self.radial_coordinates(self.facet_polygons(facet_set.wedge_set)).reshape(-1,3,2)
+        if isinstance(facet_set, Wedge_View): return self.point_coordinates[facet_set.array]
+        return self.global_coordinates([point_id for facet in facet_set for point_id in facet]).reshape(-1,3,2)
+
+    def plot_line_collection(self, crease_set, **line_properties): # draws the creases as one LineCollection, and returns it.
+        from matplotlib.collections import LineCollection
+        graph = self.pyplot().subplot()
+        line_collection = graph.add_collection(LineCollection(self.crease_segments(crease_set), **line_properties))
+        graph.autoscale_view()
         graph.set_aspect("equal")
+        return line_collection
+
+    def plot_crease_set(self): self.plot_line_collection(self.crease_set, colors = "blue")
 
-    def plot_monochromatic_crease_set(self): # if crease_is_invert is True, then switch between mountain/valley assignment.
+    def crease_layer_styles(self, line_style): # line properties of the "edges", "orthogonal_creases" and "diagonal_creases" layers. if crease_is_invert is True, then switch between mountain/valley assignment.
         crease_is_invert = self.crease_is_invert ; line_width = self.line_width
-        graph = plt.subplot() ; point_map = self.point_map
-        x,y = zip(*point_map.values())
-        edge_set = self.edge_set ; orthogonal_crease_set = self.orthogonal_crease_set ; diagonal_crease_set = self.diagonal_crease_set
-        colors = ("black", "red", "blue") # Blue creases are mountain folds, Red creases are valley folds, Black lines are edges.
-        for crease in edge_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "black", linewidth = line_width*1.3)
-        for crease in orthogonal_crease_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "black", linestyle = "dashed" if not crease_is_invert else "solid", linewidth = line_width)
-        for crease in diagonal_crease_set:
-            A,B = crease ; x,y = zip(*(self.point_map_read(A),self.point_map_read(B)))
-            plt.plot(x, y, color = "black", linestyle = "solid" if not crease_is_invert else "dashed", linewidth = line_width)
-        graph.set_aspect("equal")
+        if line_style: # Blue creases are mountain folds, Red creases are valley folds, Black lines are edges.
+            return {"edges": dict(colors = "black", linestyles = "solid", linewidths = line_width),
+                    "orthogonal_creases": dict(colors = "red" if not crease_is_invert else "blue", linestyles = "solid", linewidths = line_width),
+                    "diagonal_creases": dict(colors = "blue" if not crease_is_invert else "red", linestyles = "solid", linewidths = line_width)}
+        # Solid creases are mountain folds, dashed creases are valley folds, thick lines are edges.
+        return {"edges": dict(colors = "black", linestyles = "solid", linewidths = line_width*1.3),
+                "orthogonal_creases": dict(colors = "black", linestyles = "dashed" if not crease_is_invert else "solid", linewidths = line_width),
+                "diagonal_creases": dict(colors = "black", linestyles = "solid" if not crease_is_invert else "dashed", linewidths = line_width)}
+
+    def plot_crease_layers(self, line_style):
+        crease_layer_styles = self.crease_layer_styles(line_style)
+        for layer, crease_set in (("edges", self.edge_set), ("orthogonal_creases", self.orthogonal_crease_set), ("diagonal_creases", self.diagonal_crease_set)):
+            self.artists[layer] = [self.plot_line_collection(crease_set, **crease_layer_styles[layer])]
+
+    def plot_colored_crease_set(self): self.plot_crease_layers(1)
+
+    def plot_monochromatic_crease_set(self): self.plot_crease_layers(0)
 
     def plot_facet_set(self):
-        graph = plt.subplot() ; facet_set = self.facet_set ; k_sequence = self.k_sequence
-        '''plot central polygon'''
-        polygon_point_coordinates = list()
-        for k in k_sequence:
-            polygon_point_coordinates.append(self.point_map_read((0,0,k)))
-        x,y = zip(*polygon_point_coordinates)
-        plt.fill(x, y, facecolor='yellow', edgecolor='white', linewidth=self.line_width)
-        '''plot wedge facets'''
-        for facet in facet_set:
-            A,B,C = facet
-            x,y = zip(*(self.point_map_read(A),self.point_map_read(B),self.point_map_read(C)))
-            plt.fill(x, y, facecolor='lime', edgecolor='white', linewidth=self.line_width)
+        from matplotlib.collections import PolyCollection
+        graph = self.pyplot().subplot() ; k_sequence = self.k_sequence
+        '''central polygon first, then wedge facets'''
+        polygon_point_coordinates = self.global_coordinates([(0,0,k) for k in k_sequence])
+        polygons = [polygon_point_coordinates] + list(self.facet_polygons(self.facet_set))
+        facecolors = ['yellow'] + ['lime'] * (len(polygons) - 1)
+        self.artists["facets"] = [graph.add_collection(PolyCollection(polygons, facecolors=facecolors, edgecolors='white', linewidths=self.line_width))]
+        graph.autoscale_view()
         graph.set_aspect("equal")
 
     def show_plot(self):
-        #to export svg file, you can activate the line below and insert the directory you wish to save to:
-        #plt.savefig("your/directory/filename.svg", dpi=300)
-        plt.show()
+        #to export an svg, png or pdf file instead of opening a window, set output_file to the file name you wish to save to, e.g. "your/directory/filename.svg".
+        plt = self.pyplot()
+        if self.output_file:
+            plt.savefig(self.output_file, dpi=300)
+            plt.close()
+        else: plt.show()
+
+    '''UPDATING THE PLOT'''
+    # The artists of each layer of the plot are kept in self.artists. When only display options change (line_style, line_width,
+    # crease_is_invert, plot_origin, plot_points, plot_lines, plot_facets), graph() restyles them in place instead of drawing them again.
+    def plot_figure(self): # the figure of the artists of the last plot, or None.
+        for artists in self.artists.values():
+            if artists: return artists[0].figure
+        return None
+
+    def has_current_plot(self): # True if the artists of the last plot were drawn from the current geometry and their figure is still open.
+        if self.artist_parameters != (self.M, self.H, self.S): return False
+        figure = self.plot_figure()
+        return figure is not None and self.pyplot().fignum_exists(figure.number)
+
+    def update_plot(self): # applies the display options to the current plot, drawing the layers that are shown for the first time.
+        layers = (("origin", self.plot_origin, self.plot_origin_point), ("points", self.plot_points, self.plot_point_set), ("facets", self.plot_facets, self.plot_facet_set),
+                  ("edges", self.plot_lines, lambda: self.plot_crease_layers(self.line_style)))
+        for layer, is_visible, plot_layer in layers:
+            if is_visible and layer not in self.artists: plot_layer()
+            for artist in self.artists.get(layer, ()): artist.set_visible(is_visible)
+        for layer, line_properties in self.crease_layer_styles(self.line_style).items():
+            for artist in self.artists.get(layer, ()): artist.set(visible = self.plot_lines, **line_properties)
+        for artist in self.artists.get("facets", ()): artist.set_linewidth(self.line_width)
+        if "points" in self.artists: self.update_point_labels(self.artists["points"][0].axes)
+        self.plot_figure().canvas.draw_idle()
+
+    def clear_plot(self): # removes the artists of the last plot, e.g. after M, H or S changed.
+        if "points" in self.artists and self.artists["points"][0].axes is not None:
+            for callback in self.point_label_callbacks: self.artists["points"][0].axes.callbacks.disconnect(callback)
+        for artists in self.artists.values():
+            for artist in artists:
+                if artist.axes is not None: artist.axes.ignore_existing_data_limits = True # the view is fitted to the new pattern only.
+                artist.remove()
+        self.artists = dict()
+
+    '''EXPORTING'''
+    # The exporters stream the crease pattern straight to a file, a chunk of creases at a time, without building a matplotlib figure.
+    # Each exporter calls compute() first, so the file follows the current M, H and S. Blue/solid lines are mountain folds, red/dashed lines are valley folds, black/thick lines are edges.
+    export_chunk_size = 10000 # number of creases converted to text at a time.
+    svg_unit_length = 72.0 # length in pt of one unit of the pattern in svg files: the sides of the central polygon are s inches long.
+
+    def write_crease_segments(self, file, crease_set, line_format, y_sign = 1): # writes one formatted line per crease from its coordinates (x1, y1, x2, y2).
+        rotation_matrix_array = np.identity(2)[np.newaxis]
+        if isinstance(crease_set, Radial_Set): # one wedge at a time: the segments of wedge 0 are rotated into wedge k chunk by chunk.
+            rotation_matrix_array = self.rotation_matrix_array[list(crease_set.k_sequence)] ; crease_set = crease_set.wedge_set
+        wedge_segments = self.crease_segments(crease_set).reshape(-1,2,2)
+        for rotation_matrix in rotation_matrix_array:
+            for start in range(0, len(wedge_segments), self.export_chunk_size):
+                segments = np.dot(wedge_segments[start:start+self.export_chunk_size], rotation_matrix.T).reshape(-1,4) * (1, y_sign, 1, y_sign)
+                np.savetxt(file, segments, fmt=line_format)
+
+    def point_bounds(self): # ((x_min, y_min), (x_max, y_max)) of all points of the pattern, computed one wedge at a time.
+        low, high = np.full(2, np.inf), np.full(2, -np.inf)
+        for rotation_matrix in self.rotation_matrix_array: # only one rotated wedge is held at a time.
+            wedge_coordinates = np.dot(self.point_coordinates, rotation_matrix.T)
+            low, high = np.minimum(low, wedge_coordinates.min(axis=0)), np.maximum(high, wedge_coordinates.max(axis=0))
+        return low, high
+
+    def export_svg(self, file_name): # line_style, line_width and crease_is_invert are respected as in the plot.
+        # The file has a physical size (svg_unit_length pt per unit). Line widths are line_width pt and dashes 6pt long, as in the plot,
+        # written in user units (units of the pattern), so they keep their size in every renderer and do not depend on the scale s.
+        self.compute()
+        pt = 1 / self.svg_unit_length ; line_width = self.line_width * pt ; margin = 0.05 * self.S
+        mountain_crease_set, valley_crease_set = self.mountain_valley_crease_sets()
+        if self.line_style:
+            layers = (("edges", 'stroke="#000000" stroke-width="{:g}"'.format(line_width), self.edge_set),
+                      ("mountain", 'stroke="#0000ff" stroke-width="{:g}"'.format(line_width), mountain_crease_set),
+                      ("valley", 'stroke="#ff0000" stroke-width="{:g}"'.format(line_width), valley_crease_set))
+        else:
+            layers = (("edges", 'stroke="#000000" stroke-width="{:g}"'.format(line_width*1.3), self.edge_set),
+                      ("mountain", 'stroke="#000000" stroke-width="{:g}"'.format(line_width), mountain_crease_set),
+                      ("valley", 'stroke="#000000" stroke-width="{:g}" stroke-dasharray="{:g},{:g}"'.format(line_width, 6*pt, 3*pt), valley_crease_set))
+        (x_min, y_min), (x_max, y_max) = self.point_bounds()
+        x_min, y_min, x_max, y_max = x_min - margin, y_min - margin, x_max + margin, y_max + margin
+        with open(file_name, "w") as file:
+            file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            file.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{:.3f}pt" height="{:.3f}pt" viewBox="{:.6f} {:.6f} {:.6f} {:.6f}">\n'.format(
+                (x_max - x_min) * self.svg_unit_length, (y_max - y_min) * self.svg_unit_length, x_min, -y_max, x_max - x_min, y_max - y_min))
+            for layer_name, stroke, crease_set in layers: # the y axis of svg points down, so y is written as -y.
+                file.write('<g id="{}" {} stroke-linecap="round" fill="none">\n'.format(layer_name, stroke))
+                self.write_crease_segments(file, crease_set, '<line x1="%.6f" y1="%.6f" x2="%.6f" y2="%.6f"/>', y_sign = -1)
+                file.write('</g>\n')
+            file.write('</svg>\n')
+
+    def export_dxf(self, file_name): # ASCII DXF (R12) with one layer per fold type: EDGE (black/white), MOUNTAIN (blue) and VALLEY (red).
+        self.compute()
+        mountain_crease_set, valley_crease_set = self.mountain_valley_crease_sets()
+        layers = (("EDGE", 7, self.edge_set), ("MOUNTAIN", 5, mountain_crease_set), ("VALLEY", 1, valley_crease_set)) # (layer name, AutoCAD color index, creases)
+        with open(file_name, "w") as file:
+            file.write("0\nSECTION\n2\nTABLES\n0\nTABLE\n2\nLAYER\n70\n{}\n".format(len(layers)))
+            for layer_name, color, crease_set in layers:
+                file.write("0\nLAYER\n2\n{}\n70\n0\n62\n{}\n6\nCONTINUOUS\n".format(layer_name, color))
+            file.write("0\nENDTAB\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n")
+            for layer_name, color, crease_set in layers:
+                self.write_crease_segments(file, crease_set, "0\nLINE\n8\n" + layer_name + "\n10\n%.6f\n20\n%.6f\n30\n0.0\n11\n%.6f\n21\n%.6f\n31\n0.0")
+            file.write("0\nENDSEC\n0\nEOF\n")
+
+    '''WELDING'''
+    # Points of neighboring wedges occupy the same coordinates, e.g. p(0,j,k) and p(j+1,0,k+1), so the radial duplicates are not one connected mesh.
+    # Welding merges the points that lie within weld_tolerance*S of each other, using a spatial hash: the plane is divided into square cells of
+    # that size, and each point is only compared with the points of its own cell and of the neighboring cells, so the time grows nearly linearly.
+    weld_tolerance = 1e-6 # relative to the scale s.
+    weld_cell_offsets = ((0,0), (0,1), (1,-1), (1,0), (1,1)) # half of the 3x3 neighborhood: each pair of neighboring cells is visited once.
+
+    def weld_vertices(self): # returns the (V,2) coordinates of the welded vertices, and the welded vertex of each point k*N + v of the pattern.
+        self.compute()
+        coordinates = self.radial_coordinates(self.point_coordinates).reshape(-1,2) ; tolerance = self.weld_tolerance * self.S
+        point_count = len(coordinates) ; point_ids = np.arange(point_count)
+        cells = np.floor(coordinates / tolerance).astype(np.int64)
+        cells -= cells.min(axis=0, initial=0) - 1 # cells and their neighbors have nonnegative indices.
+        cell_width = int(cells[:,1].max(initial=0)) + 2
+        cell_keys = cells[:,0] * cell_width + cells[:,1]
+        order = np.argsort(cell_keys, kind="stable") ; sorted_cell_keys = cell_keys[order] # the points of each cell are a contiguous run of order.
+        pair_list = list()
+        for offset_x, offset_y in self.weld_cell_offsets:
+            neighbor_keys = cell_keys + offset_x * cell_width + offset_y
+            start = np.searchsorted(sorted_cell_keys, neighbor_keys, side="left")
+            counts = np.searchsorted(sorted_cell_keys, neighbor_keys, side="right") - start
+            a = np.repeat(point_ids, counts)
+            b = order[np.repeat(start, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+            is_pair = (a != b) & (np.hypot(*(coordinates[a] - coordinates[b]).T) <= tolerance)
+            pair_list.append(np.column_stack((a[is_pair], b[is_pair])))
+        a, b = np.concatenate(pair_list).T
+        # connected components of the pairs: every point takes the smallest label of its neighbors until no label changes.
+        labels = point_ids
+        while True:
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, a, labels[b]) ; np.minimum.at(new_labels, b, labels[a])
+            new_labels = new_labels[new_labels]
+            if (new_labels == labels).all(): break
+            labels = new_labels
+        _, first_points, welded_vertices = np.unique(labels, return_index=True, return_inverse=True)
+        return coordinates[first_points], welded_vertices.astype(np.int32)
+
+    def welded_mesh(self): # vertex coordinates (V,2), edges (E,2) and their fold types (E,), the central polygon (M,) and the facets (F,3) of the whole welded pattern.
+        self.compute()
+        vertex_count = len(self.point_coordinates) ; wedge_offsets = vertex_count * np.arange(self.M).reshape(-1,1,1)
+        vertex_coordinates, welded_vertices = self.weld_vertices()
+        edges = np.sort(welded_vertices[self.crease_array + wedge_offsets].reshape(-1,2), axis=1)
+        edges, first_edges = np.unique(edges, axis=0, return_index=True) # creases shared by two wedges are kept once.
+        edge_types = np.tile(self.crease_type_array, self.M)[first_edges]
+        facets = welded_vertices[self.facet_array + wedge_offsets].reshape(-1,3)
+        triangles = vertex_coordinates[facets] ; u, v = triangles[:,1] - triangles[:,0], triangles[:,2] - triangles[:,0]
+        is_clockwise = u[:,0]*v[:,1] - u[:,1]*v[:,0] < 0
+        facets[is_clockwise] = facets[is_clockwise][:, ::-1] # all facets counterclockwise.
+        central_polygon = welded_vertices[vertex_count * np.arange(self.M) + self.point_vertex_ids(((0,0,0),))[0]] # p(0,0,k), counterclockwise.
+        return vertex_coordinates, edges, edge_types, central_polygon, facets
+
+    def write_json_array(self, file, array): # writes an array as a JSON list, a chunk of rows at a time.
+        for start in range(0, len(array), self.export_chunk_size):
+            if start: file.write(",")
+            file.write(json.dumps(array[start:start+self.export_chunk_size].tolist(), separators=(",", ":"))[1:-1])
+
+    def export_fold(self, file_name): # FOLD (.fold) crease pattern with welded vertices, e.g. for Origami Simulator. crease_is_invert is respected.
+        vertex_coordinates, edges, edge_types, central_polygon, facets = self.welded_mesh()
+        mountain, valley = ("M", "V") if not self.crease_is_invert else ("V", "M")
+        assignments = np.empty(3, dtype="<U1")
+        assignments[[self.EDGE, self.ORTHOGONAL_CREASE, self.DIAGONAL_CREASE]] = ("B", valley, mountain) # diagonal creases are mountain folds, unless inverted.
+        frame = {"file_spec": 1.1, "file_creator": "Bloom_Yoshimura.py", "file_classes": ["singleModel"],
+                 "frame_title": "RH-Y-{}.{}".format(self.M, self.H), "frame_classes": ["creasePattern"], "frame_attributes": ["2D"]}
+        with open(file_name, "w") as file:
+            file.write(json.dumps(frame, separators=(",", ":"))[:-1])
+            file.write(',"vertices_coords":[') ; self.write_json_array(file, vertex_coordinates.round(9) + 0.0) # + 0.0 writes -0.0 as 0.0
+            file.write('],"edges_vertices":[') ; self.write_json_array(file, edges)
+            file.write('],"edges_assignment":[') ; self.write_json_array(file, assignments[edge_types])
+            file.write('],"faces_vertices":[') ; self.write_json_array(file, central_polygon[np.newaxis]) # central polygon first, then wedge facets
+            if len(facets): file.write(",") ; self.write_json_array(file, facets)
+            file.write("]}\n")
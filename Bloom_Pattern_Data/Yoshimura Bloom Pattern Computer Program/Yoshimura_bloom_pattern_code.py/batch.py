@@ -0,0 +1,112 @@
+'''
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+BATCH GENERATOR:
+
+Renders a whole sweep of Yoshimura bloom patterns RH-Y-m.h to files without opening any window.
+The patterns are rendered in parallel, one pattern per job, on a pool of worker processes.
+
+m, h and s accept a single value, a comma separated list, or an inclusive range start:stop[:step], e.g.
+
+    python batch.py -m 4:12 --h 0,1,2,5 -s 1 --format svg png -o catalog
+    python batch.py -m 6 --h 0:10 -s 1:4:0.5 --show-facets --colored --workers 8
+
+The display options are the same as in settings.py. Run "python batch.py --help" for the full list.
+Files are named after the pattern, e.g. catalog/RH-Y-6.2_s1.svg
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+'''
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import Bloom_Yoshimura # matplotlib is imported by the workers that plot, with the Agg backend, as their patterns are saved to files.
+
+
+def parse_values(text, value_type): # "4,6,8" --> [4,6,8] ; "4:8" --> [4,5,6,7,8] ; "1:2:0.5" --> [1.0,1.5,2.0]
+    values = list()
+    for item in text.split(","):
+        bounds = item.split(":")
+        if len(bounds) == 1:
+            values.append(value_type(bounds[0]))
+            continue
+        start, stop = value_type(bounds[0]), value_type(bounds[1])
+        step = value_type(bounds[2]) if len(bounds) == 3 else value_type(1)
+        if step <= 0: raise argparse.ArgumentTypeError("step must be greater than 0: {}".format(item))
+        count = math.floor((stop - start) / step + 1e-9) + 1 # the range includes stop, but never goes past it.
+        values.extend(value_type(start + n*step) for n in range(max(count, 0)))
+    return values
+
+
+def integer_values(text): return parse_values(text, int)
+
+def decimal_values(text): return parse_values(text, float)
+
+
+def render_pattern(job): # renders one pattern (m, h, s) to one file per format, and returns the file names.
+    m, h, s, options = job
+    Bloom_Yoshimura.pattern_cache.cache_dir = options["cache_dir"] # patterns with the same m and h share their geometry, also across runs if a directory is given.
+    file_names = list()
+    for file_format in options["formats"]:
+        bloom = Bloom_Yoshimura.Bloom_Yoshimura(m,h,s) # M,H,S
+        bloom.plot_origin = options["show_origin"]
+        bloom.plot_points = options["show_points"]
+        bloom.plot_facets = options["show_facets"]
+        bloom.plot_lines = options["show_lines"]
+        bloom.line_width = options["line_width"]
+        bloom.line_style = options["line_style"]
+        bloom.crease_is_invert = options["invert_creases"]
+        file_name = os.path.join(options["output_dir"], "RH-Y-{}.{}_s{:g}.{}".format(m, h, s, file_format))
+        if file_format in ("dxf", "fold"): # crease pattern only, written without matplotlib.
+            bloom.compute()
+            if file_format == "dxf": bloom.export_dxf(file_name)
+            else: bloom.export_fold(file_name)
+        else:
+            bloom.output_file = file_name
+            bloom.graph()
+        file_names.append(file_name)
+    return file_names
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Render a sweep of Yoshimura bloom patterns RH-Y-m.h to svg, png, pdf, dxf or fold files.")
+    parser.add_argument("-m", type=integer_values, required=True, help="number of sides of the central polygon, integer >= 4.")
+    parser.add_argument("--h", type=integer_values, required=True, help="height order of the pattern, integer >= 0.")
+    parser.add_argument("-s", type=decimal_values, default=[1.0], help="scale of the pattern, decimal > 0. Default 1.")
+    parser.add_argument("-o", "--output-dir", default="output", help="directory to save the files to. Default ./output")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=("svg","png","pdf","dxf","fold"), default=["svg"], help="file format(s). dxf and fold files contain the crease pattern only. Default svg.")
+    parser.add_argument("--show-origin", action="store_true", help="show the origin of the graph.")
+    parser.add_argument("--show-points", action="store_true", help="show points (vertices).")
+    parser.add_argument("--show-facets", action="store_true", help="show facets.")
+    parser.add_argument("--hide-lines", action="store_true", help="hide lines (creases and edges).")
+    parser.add_argument("--line-width", type=float, default=1.0, help="line width factor. Default 1.")
+    parser.add_argument("--colored", action="store_true", help="colored lines instead of monochromatic lines.")
+    parser.add_argument("--invert-creases", action="store_true", help="invert the mountain/valley assignment of creases.")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes. Default: number of CPUs.")
+    parser.add_argument("--cache-dir", default=None, help="directory to cache computed (m, h) geometry in, shared between runs and workers. Default: no disk cache.")
+    return parser
+
+
+def main(arguments=None):
+    parser = build_parser()
+    args = parser.parse_args(arguments)
+    if not args.m or not args.h or not args.s: parser.error("m, h and s must each have at least one value, e.g. a range start:stop with start <= stop.")
+    if min(args.m) < 4: parser.error("m must be an integer greater than or equal to 4.")
+    if min(args.h) < 0: parser.error("h must be an integer greater than or equal to 0.")
+    if min(args.s) <= 0: parser.error("s must be a decimal greater than 0.")
+    if args.workers < 1: parser.error("the number of workers must be at least 1.")
+    options = {"formats": args.formats, "output_dir": args.output_dir, "cache_dir": args.cache_dir,
+               "show_origin": args.show_origin, "show_points": args.show_points, "show_facets": args.show_facets,
+               "show_lines": not args.hide_lines, "line_width": args.line_width, "line_style": args.colored,
+               "invert_creases": args.invert_creases}
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(m, h, s, options) for m, h, s in itertools.product(args.m, args.h, args.s)]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(render_pattern, job) for job in jobs]
+        for future in as_completed(futures):
+            for file_name in future.result(): print(file_name)
+    print("{} patterns rendered.".format(len(jobs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+'''
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+BENCHMARK:
+
+Times every stage of Bloom_Yoshimura.graph() (and the exporters) over a grid of (m, h), and measures the peak memory of each stage.
+Plots are rendered with the non-interactive Agg backend and the geometry cache is disabled, so every stage does its full work.
+
+    python benchmark.py -o results.json
+    python benchmark.py -m 4,8,16 --h 0:20:5 --repeat 5 -o after.json --compare before.json
+
+m and h accept the same values as batch.py. The results are written as JSON, one record per (m, h, stage),
+and --compare prints the time and memory ratio of each stage against an earlier results file.
+
+The cold start of a few programs (importing the program, computing and exporting one pattern) is also timed, each in a new interpreter,
+as a worker process or a command line tool runs it. "python benchmark.py --cold-start" only times these.
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+'''
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import Bloom_Yoshimura
+from batch import integer_values
+plt = Bloom_Yoshimura.pyplot(headless = True) # render headlessly, without a window.
+import matplotlib
+
+
+# stages in the order graph() runs them when nothing is cached:
+GEOMETRY_STAGES = ("define_point_set", "point_map_initialize", "define_crease_set", "define_facet_set", "classify_crease",
+                   "slant_linear_transformation", "translation_transformation", "apply_affine_transformation",
+                   "scale_linear_transformation", "define_point_radial_duplicates", "define_crease_radial_duplicates",
+                   "define_facet_radial_duplicates", "sequential_rotation_linear_transformation")
+PLOTTING_STAGES = ("plot_origin_point", "plot_point_set", "plot_colored_crease_set", "plot_monochromatic_crease_set", "plot_facet_set", "show_plot")
+EXPORTING_STAGES = ("export_svg", "export_dxf")
+STAGES = GEOMETRY_STAGES + PLOTTING_STAGES + EXPORTING_STAGES
+# programs timed from a cold start of the interpreter, as a worker process or a command line tool runs them:
+COLD_START_PROGRAMS = (("python", "pass"),
+                       ("import numpy", "import numpy"),
+                       ("import Bloom_Yoshimura", "import Bloom_Yoshimura"),
+                       ("compute and export_svg RH-Y-6.2", "import os, Bloom_Yoshimura ; bloom = Bloom_Yoshimura.Bloom_Yoshimura(6,2,1) ; bloom.compute() ; bloom.export_svg(os.devnull)"),
+                       ("compute and graph RH-Y-6.2 to png", "import io, Bloom_Yoshimura ; bloom = Bloom_Yoshimura.Bloom_Yoshimura(6,2,1) ; bloom.plot_lines = True ; bloom.output_file = io.BytesIO() ; bloom.graph()"))
+
+
+def run_stages(m, h, stages, monitor): # runs the stages on a new pattern, through the monitor, and returns the pattern.
+    bloom = Bloom_Yoshimura.Bloom_Yoshimura(m,h,1)
+    bloom.cache = None
+    bloom.output_file = io.BytesIO() # show_plot renders the figure to memory instead of opening a window.
+    bloom.monitor = monitor
+    for stage in stages:
+        if stage in EXPORTING_STAGES: bloom.run_stage(getattr(bloom, stage), os.devnull)
+        else: bloom.run_stage(getattr(bloom, stage))
+        if stage == GEOMETRY_STAGES[-1]: bloom.computed_parameters = (m, h, 1) # the exporters do not compute the pattern again.
+    plt.close("all")
+    return bloom
+
+
+def time_stages(m, h, stages, repeat): # best time of each stage, in seconds, over repeat runs of the whole pipeline.
+    monitor = Bloom_Yoshimura.Stage_Monitor()
+    for _ in range(repeat): run_stages(m, h, stages, monitor)
+    seconds = {stage: float("inf") for stage in stages}
+    for record in monitor.records: seconds[record["stage"]] = min(seconds[record["stage"]], record["seconds"])
+    return seconds
+
+
+def measure_stages(m, h, stages): # peak memory allocated during each stage, in bytes, and the element counts after the pipeline.
+    monitor = Bloom_Yoshimura.Stage_Monitor(trace_memory=True)
+    bloom = run_stages(m, h, stages, monitor)
+    peak_bytes = {record["stage"]: record["peak_bytes"] for record in monitor.records}
+    counts = {"points": len(bloom.point_set), "creases": len(bloom.crease_set), "facets": len(bloom.facet_set)}
+    return peak_bytes, counts
+
+
+def benchmark(m_values, h_values, stages, repeat):
+    records = list()
+    for m in m_values:
+        for h in h_values:
+            seconds = time_stages(m, h, stages, repeat)
+            peak_bytes, counts = measure_stages(m, h, stages)
+            for stage in stages:
+                records.append(dict(m=m, h=h, stage=stage, seconds=seconds[stage], peak_bytes=peak_bytes[stage], **counts))
+            print("m={:<3} h={:<3} {:>8} creases  {:8.4f} s".format(m, h, counts["creases"], sum(seconds.values())))
+    return records
+
+
+def cold_start(repeat): # best wall time of each cold start program, in seconds, each run in a new interpreter.
+    seconds = dict()
+    for name, program in COLD_START_PROGRAMS:
+        seconds[name] = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", program], check=True, cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, MPLBACKEND="Agg"))
+            seconds[name] = min(seconds[name], time.perf_counter() - start)
+        print("{:<45} {:8.4f} s".format(name, seconds[name]))
+    return seconds
+
+
+def environment():
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(), "platform": platform.platform(),
+            "numpy": np.__version__, "matplotlib": matplotlib.__version__}
+
+
+def compare(records, previous_records): # prints the time and memory ratio (current / previous) of each stage, summed over the common (m, h).
+    previous = {(r["m"], r["h"], r["stage"]): r for r in previous_records}
+    print("\n{:<45} {:>12} {:>12} {:>8} {:>8}".format("stage", "seconds", "previous", "time", "memory"))
+    for stage in dict.fromkeys(r["stage"] for r in records):
+        pairs = [(r, previous[(r["m"], r["h"], stage)]) for r in records if r["stage"] == stage and (r["m"], r["h"], stage) in previous]
+        if not pairs: continue
+        seconds, previous_seconds = sum(r["seconds"] for r, _ in pairs), sum(p["seconds"] for _, p in pairs)
+        peak_bytes, previous_peak_bytes = sum(r["peak_bytes"] for r, _ in pairs), sum(p["peak_bytes"] for _, p in pairs)
+        print("{:<45} {:>12.5f} {:>12.5f} {:>7.2f}x {:>7.2f}x".format(stage, seconds, previous_seconds,
+              seconds / previous_seconds if previous_seconds else float("nan"), peak_bytes / previous_peak_bytes if previous_peak_bytes else float("nan")))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Time every stage of Bloom_Yoshimura.graph() over a grid of (m, h).")
+    parser.add_argument("-m", type=integer_values, default=[4,6,8,16,32,64], help="number of sides of the central polygon. Default 4,6,8,16,32,64")
+    parser.add_argument("--h", type=integer_values, default=[0,1,2,5,10,20,50], help="height order of the pattern. Default 0,1,2,5,10,20,50")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs; the best time of each stage is kept. Default 3.")
+    parser.add_argument("--skip", nargs="+", default=[], choices=PLOTTING_STAGES + EXPORTING_STAGES, metavar="STAGE", help="plotting or exporting stages not to run, e.g. plot_point_set for very large patterns.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON file to write the results to. Default benchmark.json")
+    parser.add_argument("--compare", default=None, help="earlier JSON results file to compare with.")
+    parser.add_argument("--cold-start", action="store_true", help="only time the cold start programs, e.g. importing the program and exporting one pattern.")
+    args = parser.parse_args(arguments)
+    stages = tuple(stage for stage in STAGES if stage not in args.skip)
+    records = benchmark(args.m, args.h, stages, args.repeat) if not args.cold_start else list()
+    cold_start_seconds = cold_start(max(args.repeat, 5))
+    with open(args.output, "w") as file: json.dump({"environment": environment(), "repeat": args.repeat, "cold_start": cold_start_seconds, "results": records}, file, indent=1)
+    print("results written to {}".format(args.output))
+    if args.compare:
+        with open(args.compare) as file: previous_results = json.load(file)
+        compare(records, previous_results["results"])
+        for name, seconds in cold_start_seconds.items():
+            if name in previous_results.get("cold_start", {}): print("cold start: {:<45} {:>7.2f}x".format(name, seconds / previous_results["cold_start"][name]))
+
+
+if __name__ == "__main__":
+    main()
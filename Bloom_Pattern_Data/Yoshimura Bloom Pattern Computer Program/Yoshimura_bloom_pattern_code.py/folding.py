@@ -0,0 +1,374 @@
+'''
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+FOLDING:
+
+Computes 3D folded states of a Yoshimura bloom pattern from its crease pattern, for a batch of fold parameters t at once.
+t = 0 is the flat pattern and t = 1 drives every crease towards its full fold angle (mountain_angle or valley_angle, 180 degrees by default).
+
+The pattern is modelled as a bar-and-hinge structure, as in origami simulators: every crease is a stiff bar that keeps its length,
+so the facets stay (almost) rigid, and every crease between two facets is a soft hinge whose fold angle is driven towards
+t times its full fold angle. Yoshimura bloom patterns are not rigidly foldable, so the folded state is the least-squares
+compromise between the two, with stiffness_ratio weighting the bars against the hinges; strain() measures how far the
+creases are stretched. The state is found by Levenberg-Marquardt iterations along one path from flat, in steps of continuation_step of t,
+each step starting from the path extrapolated along its last step. A step whose solution stretches a crease by more than strain_tolerance is taken
+again in halves; if the creases are still stretched that far, Folding_Error is raised instead of returning the folded states.
+The hinges are not held to their targets either: fold_angle_error() measures how far they miss them, and fold_direction_error() how far a hinge
+folds against its crease (a valley crease folded as a mountain, or folded on past flat). In RH-Y-6.2 and RH-Y-8.3 the folds follow their creases up to t = 0.6;
+beyond, and sooner in other patterns (from t = 0.15 in RH-Y-6.6), some hinges reverse, and at t = 1 a hinge can miss its target by 90 degrees or more.
+The unknowns are ordered in breadth-first levels, in which J^T J is block tridiagonal, so each iteration solves a few small blocks instead of one dense matrix.
+
+Only wedge 0 is solved: the points on its seam with wedge 1 are rotations of the points on its other seam, so every folded state
+has the M-fold rotational symmetry of the pattern, the wedges always meet, and the central polygon stays flat in place.
+Every frame leaves the path at the last step before its own t, and the frames of each step are solved together as one batch.
+
+Supported sizes: patterns up to m = 16 with h up to 24, and m = 24 with h up to 10, fold to t = 1 within strain_tolerance. 100 frames take about
+1 to 2 s at h = 10 and 5 to 16 s at h = 16 to 24 (one core), growing about as h**2. From m = 32 and h = 10 the creases stretch past strain_tolerance
+near t = 1 (by 0.116 in RH-Y-32.10, 0.126 in RH-Y-32.20), depending on the frames, and Folding_Error is raised.
+
+    python folding.py -m 6 --h 2 --frames 200 --show 0.5
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+'''
+import argparse
+import collections
+import time
+
+import numpy as np
+import Bloom_Yoshimura
+from batch import integer_values
+
+
+class Folding_Error(ValueError): pass # the folded states of a pattern stretch its creases by more than strain_tolerance.
+
+
+class Bloom_Folding:
+    stiffness_ratio = 1e4 # weight of the squared strain of the bars relative to the squared fold angle error of the hinges (radians).
+    continuation_step = 0.05 # the fold angles are driven from flat to their targets in steps of this fold parameter, each starting from the last.
+    newton_iterations = 20 # largest number of Levenberg-Marquardt iterations of each step.
+    convergence_tolerance = 1e-2 # the iterations of a step stop once they decrease the cost of every frame by less than this fraction.
+    seed_height = 1e-3 # slope of the bowl the folding starts from, see fold_wedge.
+    continuation_halvings = 4 # where a step stretches a crease by more than strain_tolerance, it is taken again in halves, down to continuation_step / 2**continuation_halvings.
+    strain_tolerance = 0.05 # Folding_Error is raised when a crease is stretched or shortened by more than this fraction of its length.
+    direction_tolerance = np.radians(10) # main reports the frames in which a hinge folds against its crease by more than this angle.
+
+    def __init__(self, bloom, mountain_angle = np.pi, valley_angle = np.pi):
+        """ input variables """
+        self.bloom = bloom # a Bloom_Yoshimura pattern; compute() is called, so the geometry follows the current M, H and S.
+        self.mountain_angle = mountain_angle # fold angle of mountain creases at t = 1, in radians.
+        self.valley_angle = valley_angle # fold angle of valley creases at t = 1, in radians.
+        """ variables for computation: """
+        self.flat_coordinates = np.empty((0,3)) # (N,3) array of the flat points of wedge 0, z = 0.
+        self.rotation_matrix_array = np.tile(np.identity(3), (bloom.M,1,1)) # (M,3,3) rotations around the z axis from wedge 0 to wedge k.
+        # the unknowns are the independent points of wedge 0 and the origin (last). Point v of wedge k (v = N for the origin) is
+        # rotation_matrix_array[(k + vertex_wedges[v]) % M] applied to unknown vertex_unknowns[v].
+        self.vertex_unknowns = np.empty(0, dtype=int)
+        self.vertex_wedges = np.empty(0, dtype=int)
+        self.unknown_is_fixed = np.empty(0, dtype=bool) # the central polygon and the origin do not move.
+        self.flat_unknowns = np.empty((0,3))
+        self.bar_array = np.empty((0,2), dtype=int) # (B,2) vertices of wedge 0 of the creases whose lengths are kept, once per symmetric copy.
+        self.bar_length_array = np.empty(0) # (B,) flat lengths.
+        self.hinge_array = np.empty((0,4,2), dtype=int) # (K,4,(wedge, vertex)) points x1, x2, x3, x4 of each hinge: crease x3--x4, x1 on its left and x2 on its right in the flat pattern.
+        self.hinge_crease_array = np.empty(0, dtype=int) # (K,) crease of wedge 0 of each hinge.
+        self.residual_points = np.empty((0,4,2), dtype=int) # (R,4,(wedge, vertex)) points of each residual: the two ends of each bar (padded with the origin), then x1..x4 of each hinge.
+        # the free unknowns are ordered in levels, so that the residuals only couple unknowns of the same or of neighboring levels:
+        self.unknown_levels = np.empty(0, dtype=int) # (U,) level of each unknown, -1 for the fixed unknowns.
+        self.unknown_positions = np.empty(0, dtype=int) # (U,) position of each unknown in its level.
+        self.level_count = 0
+        self.level_sizes = np.empty(0, dtype=int) # (L,) number of unknowns of each level.
+        bloom.compute() # returns at once if the geometry is current.
+        self.define_flat_coordinates()
+        self.define_symmetry()
+        self.define_bars()
+        self.define_hinges()
+        self.define_levels()
+
+    '''DEFINING THE MODEL'''
+    def define_flat_coordinates(self):
+        bloom = self.bloom
+        self.flat_coordinates = np.column_stack((bloom.point_coordinates, np.zeros(len(bloom.point_coordinates))))
+        self.rotation_matrix_array = np.zeros((bloom.M,3,3)) ; self.rotation_matrix_array[:, 2, 2] = 1
+        self.rotation_matrix_array[:, :2, :2] = bloom.rotation_matrix_array
+
+    def define_symmetry(self): # a point of wedge 0 on its seam with wedge 1 is the rotation into wedge 1 of a point of wedge 0 on the other seam.
+        bloom = self.bloom ; vertex_count = len(self.flat_coordinates)
+        _, welded_vertices = bloom.weld_vertices()
+        wedge_1_vertices = np.full(welded_vertices.max() + 1, -1) ; wedge_1_vertices[welded_vertices[vertex_count:2*vertex_count]] = np.arange(vertex_count)
+        sources = np.append(wedge_1_vertices[welded_vertices[:vertex_count]], -1) # the origin (v = N) is its own unknown.
+        is_dependent = sources >= 0 ; independent = np.flatnonzero(~is_dependent)
+        unknown_ids = np.full(vertex_count + 1, -1) ; unknown_ids[independent] = np.arange(len(independent))
+        self.vertex_unknowns = np.where(is_dependent, unknown_ids[sources], unknown_ids)
+        self.vertex_wedges = is_dependent.astype(int)
+        self.flat_unknowns = np.vstack((self.flat_coordinates, np.zeros(3)))[independent]
+        self.unknown_is_fixed = np.zeros(len(independent), dtype=bool)
+        self.unknown_is_fixed[self.vertex_unknowns[np.append(bloom.point_vertex_ids(((0,0,0), (1,0,0))), vertex_count)]] = True
+
+    def define_bars(self): # every crease of wedge 0, except the creases of the seam with wedge 1, which are rotations of the creases of the other seam.
+        crease_array = self.bloom.crease_array ; is_dependent = self.vertex_wedges[crease_array] == 1
+        self.bar_array = crease_array[~is_dependent.all(axis=1)]
+        self.bar_length_array = np.linalg.norm(self.flat_coordinates[self.bar_array[:,0]] - self.flat_coordinates[self.bar_array[:,1]], axis=1)
+
+    def define_hinges(self): # the creases of define_bars between two facets, and the sides of the central polygon, hinged on a triangle of the polygon and the origin.
+        bloom = self.bloom ; M = bloom.M ; vertex_count = len(self.flat_coordinates)
+        _, welded_vertices = bloom.weld_vertices() ; welded_vertices = np.append(welded_vertices, welded_vertices.max() + 1) # the origin, as point M*N.
+        # the three edges of every facet of wedges M-1, 0 and 1, as welded (start, end) pairs, with the point opposite each edge.
+        wedge_facets = np.concatenate([bloom.facet_array + vertex_count * k for k in (M-1, 0, 1)])
+        edges = wedge_facets[:, [[0,1],[1,2],[2,0]]].reshape(-1,2) ; opposites = wedge_facets[:, [2,0,1]].ravel()
+        edge_keys = np.sort(welded_vertices[edges], axis=1) ; edge_keys = edge_keys[:,0].astype(np.int64) * len(welded_vertices) + edge_keys[:,1]
+        order = np.argsort(edge_keys, kind="stable") ; edge_keys, opposites = edge_keys[order], opposites[order]
+        bar_keys = np.sort(welded_vertices[self.bar_array], axis=1) ; bar_keys = bar_keys[:,0].astype(np.int64) * len(welded_vertices) + bar_keys[:,1]
+        start, end = np.searchsorted(edge_keys, bar_keys, side="left"), np.searchsorted(edge_keys, bar_keys, side="right")
+        central_crease = np.sort(bloom.point_vertex_ids(((0,0,0), (1,0,0))))
+        is_central = (self.bar_array == central_crease).all(axis=1)
+        is_hinge = (end - start == 2) | (is_central & (end - start == 1))
+        start, end = start[is_hinge], end[is_hinge] # without facets (h = 0) there is no hinge.
+        x1 = opposites[start] ; x2 = np.where(end - start == 2, opposites[np.minimum(start + 1, len(opposites) - 1)], M * vertex_count)
+        x3, x4 = self.bar_array[is_hinge].T
+        points = np.stack((x1, x2, x3, x4), axis=1)
+        hinges = np.stack(np.divmod(points, vertex_count), axis=2) # (wedge, vertex); the origin is (M, 0) here.
+        hinges[points == M * vertex_count] = (0, vertex_count)
+        # x1 on the left of x3 --> x4 in the flat pattern, x2 on its right.
+        flat_points = self.flat_positions(hinges)
+        is_right = np.cross(flat_points[:,3] - flat_points[:,2], flat_points[:,0] - flat_points[:,2])[:,2] < 0
+        hinges[is_right, :2] = hinges[is_right, 1::-1]
+        self.hinge_array = hinges
+        self.hinge_crease_array = np.searchsorted(bloom.crease_array[:,0].astype(np.int64) * vertex_count + bloom.crease_array[:,1], x3.astype(np.int64) * vertex_count + x4)
+        bars = np.zeros((len(self.bar_array), 4, 2), dtype=int) ; bars[:,:2,1] = self.bar_array ; bars[:,2:,1] = vertex_count
+        self.residual_points = np.concatenate((bars, self.hinge_array))
+
+    def define_levels(self): # breadth-first levels of the free unknowns (as in the Cuthill-McKee ordering), from an unknown at one end of the wedge.
+        unknown_count = len(self.flat_unknowns) ; neighbors = [set() for _ in range(unknown_count)]
+        for row in self.vertex_unknowns[self.residual_points[...,1]].tolist():
+            for unknown in row: neighbors[unknown].update(row)
+        levels = np.full(unknown_count, -1) ; level_count = 0
+        for first in np.flatnonzero(~self.unknown_is_fixed): # one breadth-first search per connected part of the wedge.
+            if levels[first] >= 0: continue
+            for _ in range(2): # the search is started again from the last unknown found, which lies at the far end of the wedge.
+                component = self.breadth_first_levels(first, neighbors)
+                first = max(component, key=component.get)
+            for unknown, level in component.items(): levels[unknown] = level_count + level
+            level_count += max(component.values()) + 1
+        self.unknown_levels, self.level_count = levels, level_count
+        self.unknown_positions = np.zeros(unknown_count, dtype=int) ; self.level_sizes = np.zeros(level_count, dtype=int)
+        for unknown in np.flatnonzero(levels >= 0): self.unknown_positions[unknown] = self.level_sizes[levels[unknown]] ; self.level_sizes[levels[unknown]] += 1
+
+    def breadth_first_levels(self, first, neighbors): # level of each free unknown connected to the first one, as a dict.
+        component = {first: 0} ; queue = collections.deque((first,))
+        while queue:
+            unknown = queue.popleft()
+            for neighbor in neighbors[unknown]:
+                if neighbor not in component and not self.unknown_is_fixed[neighbor]: component[neighbor] = component[unknown] + 1 ; queue.append(neighbor)
+        return component
+
+    def flat_positions(self, points): # flat coordinates of an array (...,2) of points (wedge, vertex).
+        return self.positions(self.flat_unknowns[np.newaxis], points)[0]
+
+    def positions(self, unknowns, points): # (T,...,3) coordinates of an array (...,2) of points (wedge, vertex), from the unknowns (T,U,3).
+        return self.rotate(unknowns[:, self.vertex_unknowns[points[...,1]]], self.point_wedges(points))
+
+    def point_wedges(self, points): return (points[...,0] + self.vertex_wedges[points[...,1]]) % self.bloom.M # wedge of the unknown of each point (wedge, vertex)
+
+    def rotate(self, vectors, wedges, inverse = False): # vectors (T,...,3) rotated around the z axis from wedge 0 to the wedges (...), or back if inverse is True.
+        cos, sin = self.rotation_matrix_array[wedges, 0, 0], self.rotation_matrix_array[wedges, 1, 0] * (-1 if inverse else 1)
+        x, y = vectors[...,0], vectors[...,1]
+        return np.stack((cos * x - sin * y, sin * x + cos * y, vectors[...,2]), axis=-1)
+
+    '''FOLDING'''
+    def crease_fold_angles(self, t): # (T,E) signed fold angle of each crease of wedge 0: valley folds are positive, mountain folds are negative, edges are not folded.
+        bloom = self.bloom ; crease_type_array = bloom.crease_type_array
+        is_mountain = crease_type_array == (bloom.DIAGONAL_CREASE if not bloom.crease_is_invert else bloom.ORTHOGONAL_CREASE)
+        is_valley = crease_type_array == (bloom.ORTHOGONAL_CREASE if not bloom.crease_is_invert else bloom.DIAGONAL_CREASE)
+        full_angles = np.where(is_valley, self.valley_angle, 0.0) - np.where(is_mountain, self.mountain_angle, 0.0)
+        return np.multiply.outer(t, full_angles)
+
+    def hinge_fold_angles(self, x1, x2, x3, x4, gradients = False): # (T,K) signed fold angles of the hinges, and optionally their gradients (T,K,4,3) with respect to x1..x4.
+        edge = x4 - x3 ; edge_length = np.linalg.norm(edge, axis=-1, keepdims=True)
+        normal_1, normal_2 = np.cross(x1 - x3, x1 - x4), np.cross(x2 - x4, x2 - x3)
+        normal_1_squared, normal_2_squared = (normal_1**2).sum(axis=-1, keepdims=True), (normal_2**2).sum(axis=-1, keepdims=True)
+        sin = (edge * np.cross(normal_2, normal_1)).sum(axis=-1) / edge_length[...,0] ; cos = (normal_1 * normal_2).sum(axis=-1)
+        angles = np.arctan2(sin, cos) # positive for valley folds: x2 rises above the plane of x1, x3, x4.
+        if not gradients: return angles
+        a, b = normal_1 / normal_1_squared, normal_2 / normal_2_squared ; unit_edge = edge / edge_length
+        gradients = np.stack((edge_length * a, edge_length * b,
+                              ((x1 - x4) * unit_edge).sum(axis=-1, keepdims=True) * a + ((x2 - x4) * unit_edge).sum(axis=-1, keepdims=True) * b,
+                              -((x1 - x3) * unit_edge).sum(axis=-1, keepdims=True) * a - ((x2 - x3) * unit_edge).sum(axis=-1, keepdims=True) * b), axis=-2)
+        return angles, gradients
+
+    def residuals(self, unknowns, target_angles): # (T,R) residuals of the bars and hinges, and their gradients (T,R,4,3) with respect to the unknowns of residual_points.
+        bar_points = self.positions(unknowns, self.residual_points[:len(self.bar_array), :2])
+        vectors = bar_points[:,:,0] - bar_points[:,:,1] ; lengths = np.linalg.norm(vectors, axis=-1)
+        weight = np.sqrt(self.stiffness_ratio) / self.bar_length_array
+        bar_residuals = weight * (lengths - self.bar_length_array)
+        bar_gradients = np.zeros(bar_points.shape[:2] + (4,3)) ; bar_gradients[:,:,0] = (weight / lengths)[..., np.newaxis] * vectors ; bar_gradients[:,:,1] = -bar_gradients[:,:,0]
+        angles, hinge_gradients = self.hinge_fold_angles(*np.moveaxis(self.positions(unknowns, self.residual_points[len(self.bar_array):]), 2, 0), gradients=True)
+        hinge_residuals = (angles - target_angles + np.pi) % (2*np.pi) - np.pi
+        gradients = np.concatenate((bar_gradients, hinge_gradients), axis=1) # with respect to the points, rotated back onto the unknowns.
+        return np.concatenate((bar_residuals, hinge_residuals), axis=1), self.rotate(gradients, self.point_wedges(self.residual_points), inverse=True)
+
+    def solve(self, target_angles, unknowns): # least-squares unknowns (T,U,3) for the target hinge angles (T,K), from the initial unknowns, by Levenberg-Marquardt iterations.
+        frame_count = len(unknowns) ; level_count, size = self.level_count, 3 * self.level_sizes.max(initial=0)
+        column_unknowns = np.repeat(self.vertex_unknowns[self.residual_points[...,1]], 3, axis=1) # (R,12) unknown of each column of the gradients in the Jacobian
+        levels = self.unknown_levels[column_unknowns] ; positions = 3 * self.unknown_positions[column_unknowns] + np.tile(np.arange(3), 4)
+        # J^T J is block tridiagonal in the levels. Its diagonal blocks (level l, level l) and lower blocks (level l+1, level l) are summed
+        # from the 12x12 blocks of the residuals, without building the sparse Jacobian J; the fixed unknowns do not move and are left out.
+        row_levels, column_levels = levels[:, :, np.newaxis], levels[:, np.newaxis, :]
+        is_stored = (column_levels >= 0) & ((row_levels == column_levels) | (row_levels == column_levels + 1))
+        block_ids = (((2 * column_levels + (row_levels != column_levels)) * size + positions[:, :, np.newaxis]) * size + positions[:, np.newaxis, :])[is_stored]
+        stored_rows, stored_columns = np.nonzero(is_stored.reshape(len(is_stored), -1)) ; stored_rows, stored_columns = 12 * stored_rows + stored_columns // 12, 12 * stored_rows + stored_columns % 12
+        # the products are summed in the order of their entries of the blocks, so that each entry is a contiguous run of products.
+        order = np.argsort(block_ids, kind="stable") ; block_ids, stored_rows, stored_columns = block_ids[order], stored_rows[order], stored_columns[order]
+        run_starts = np.flatnonzero(np.append(True, block_ids[1:] != block_ids[:-1])) ; block_ids = block_ids[run_starts]
+        is_free = levels >= 0 ; vector_ids = (np.arange(frame_count)[:, np.newaxis] * (level_count * size) + (levels * size + positions)[is_free]).ravel()
+        free = np.flatnonzero(self.unknown_levels >= 0) ; level_ids = ((self.unknown_levels * size + 3 * self.unknown_positions)[free, np.newaxis] + np.arange(3)).ravel()
+        unknown_ids = (3 * free[:, np.newaxis] + np.arange(3)).ravel()
+        diagonal_ids = np.arange(size)
+        damping = np.full(frame_count, 1e-3) # relative to the diagonal of J^T J, for each frame.
+        is_converged = np.zeros(frame_count, dtype=bool)
+        residuals, gradients = self.residuals(unknowns, target_angles) ; cost = (residuals**2).sum(axis=1)
+        for iteration in range(self.newton_iterations):
+            gradient_rows = gradients.reshape(frame_count, -1, 12)
+            gradient_columns = np.ascontiguousarray(gradients.reshape(frame_count, -1).T) # (R*12,T): the gradients of all frames for each column are contiguous.
+            blocks = np.zeros((frame_count, level_count * 2 * size**2))
+            blocks[:, block_ids] = np.add.reduceat(gradient_columns[stored_rows] * gradient_columns[stored_columns], run_starts, axis=0).T
+            blocks = blocks.reshape(frame_count, level_count, 2, size, size)
+            right_side = -np.bincount(vector_ids, (gradient_rows * residuals[..., np.newaxis])[:, is_free].ravel(), frame_count * level_count * size).reshape(frame_count, level_count, size)
+            diagonal = blocks[:, :, 0, diagonal_ids, diagonal_ids] + 1e-12
+            blocks[:, :, 0, diagonal_ids, diagonal_ids] += damping[:, np.newaxis, np.newaxis] * diagonal
+            step = np.zeros((frame_count, unknowns[0].size))
+            step[:, unknown_ids] = self.solve_block_tridiagonal(blocks, right_side, 3 * self.level_sizes).reshape(frame_count, -1)[:, level_ids]
+            step = step.reshape(unknowns.shape)
+            # the first step follows the new target angles; later steps are taken by the frames whose cost decreases, the others try again with more damping.
+            new_residuals, new_gradients = self.residuals(unknowns + step, target_angles) ; new_cost = (new_residuals**2).sum(axis=1)
+            is_better = (new_cost < cost) | (iteration == 0)
+            unknowns = np.where(is_better[:, np.newaxis, np.newaxis], unknowns + step, unknowns)
+            residuals = np.where(is_better[:, np.newaxis], new_residuals, residuals) ; gradients = np.where(is_better[:, np.newaxis, np.newaxis, np.newaxis], new_gradients, gradients)
+            is_converged = is_converged | (is_better & (cost - new_cost <= self.convergence_tolerance * cost) & (iteration > 0))
+            cost = np.where(is_better, new_cost, cost) ; damping = np.where(is_better, damping / 3, damping * 4)
+            if is_converged.all(): break
+        return unknowns
+
+    @staticmethod
+    def solve_block_tridiagonal(blocks, right_side, sizes): # (T,L,P) solutions of the block tridiagonal systems of the diagonal blocks (T,L,0,P,P), lower blocks (T,L,1,P,P) (level l+1, level l)
+        # and right sides (T,L,P), of which only the first sizes[l] rows and columns of level l are used. The levels are eliminated in order, then solved back.
+        eliminated = list() # S_l^-1 [B_l^T | y_l] of each level l, where S_l and y_l are its blocks once the levels before it are eliminated, and B_l is its lower block.
+        for level, size in enumerate(sizes):
+            diagonal, vector = blocks[:, level, 0, :size, :size], right_side[:, level, :size, np.newaxis]
+            if level:
+                lower = blocks[:, level - 1, 1, :size, :sizes[level - 1]]
+                diagonal = diagonal - np.matmul(lower, eliminated[-1][..., :-1]) ; vector = vector - np.matmul(lower, eliminated[-1][..., -1:])
+            upper = blocks[:, level, 1, :sizes[level + 1], :size].swapaxes(1,2) if level < len(sizes) - 1 else np.empty(vector.shape[:2] + (0,))
+            eliminated.append(np.linalg.solve(diagonal, np.concatenate((upper, vector), axis=2)))
+        solution = np.zeros_like(right_side)
+        for level in reversed(range(len(sizes))):
+            solution[:, level, :sizes[level]] = eliminated[level][..., -1]
+            if level < len(sizes) - 1: solution[:, level, :sizes[level]] -= np.matmul(eliminated[level][..., :-1], solution[:, level + 1, :sizes[level + 1], np.newaxis])[..., 0]
+        return solution
+
+    def fold_wedge(self, t): # (T,N,3) folded points of wedge 0 for each fold parameter t of a (T,) array.
+        t = np.asarray(t, dtype=float).reshape(-1)
+        # the folding follows one path from flat, in steps of continuation_step; each frame leaves the path at the step before its own t and is solved from there.
+        # The flat pattern is a saddle point, so the path starts from a slight bowl, as the valley folds of the central polygon lift the wedges.
+        unknowns = np.repeat(self.flat_unknowns[np.newaxis], len(t), axis=0)
+        path = self.flat_unknowns + np.outer(self.seed_height * (1 - self.unknown_is_fixed), (0,0,1)) * np.linalg.norm(self.flat_unknowns, axis=1, keepdims=True)
+        path = path[np.newaxis] ; level = 0.0 ; step = self.continuation_step
+        tangent = np.zeros_like(path) # d(unknowns)/dt along the path, from its last two points.
+        while len(self.hinge_array) and level < t.max(initial=0):
+            next_level = min(level + step, t.max())
+            is_leaving = (t > level) & (t <= next_level) ; levels = np.append(next_level, t[is_leaving])
+            # each frame starts from the path extrapolated to its t, and is corrected by solve.
+            solution = self.solve(self.crease_fold_angles(levels)[:, self.hinge_crease_array], path + (levels - level)[:, np.newaxis, np.newaxis] * tangent)
+            if self.strain(self.wedge_points(solution)[:, np.newaxis]).max() > self.strain_tolerance and step > self.continuation_step / 2**self.continuation_halvings:
+                step /= 2 ; continue # the iterations did not converge from this far: the step is taken again in two halves.
+            tangent = (solution[:1] - path) / (next_level - level)
+            path, unknowns[is_leaving], level = solution[:1], solution[1:], next_level
+            step = min(2 * step, self.continuation_step)
+        points = self.wedge_points(unknowns)
+        strain = self.strain(points[:, np.newaxis])
+        if strain.max(initial=0) > self.strain_tolerance:
+            raise Folding_Error("RH-Y-{}.{}: the folded state at t = {:.4g} stretches the creases by up to {:.3g} of their length; the facets are not rigid there.".format(
+                                self.bloom.M, self.bloom.H, t[np.argmax(strain)], strain.max()))
+        return points
+
+    def wedge_points(self, unknowns): # (T,N,3) points of wedge 0 from the unknowns (T,U,3).
+        vertices = np.arange(len(self.flat_coordinates))
+        return self.positions(unknowns, np.column_stack((np.zeros_like(vertices), vertices)))
+
+    def fold(self, t): # (T,M,N,3) folded points p(i,j,k) of the whole pattern for each t of a (T,) array, or (M,N,3) for a single t.
+        wedge_points = self.fold_wedge(t)
+        points = np.einsum("kab,tnb->tkna", self.rotation_matrix_array, wedge_points)
+        return points if np.ndim(t) else points[0]
+
+    def frames(self, frame_count = 200, t_max = 1.0): # (frame_count,M,N,3) folded states from flat (t = 0) to t_max, e.g. for an animation.
+        return self.fold(np.linspace(0, t_max, frame_count))
+
+    def strain(self, points): # (T,) largest relative change of length of a crease, for points (T,M,N,3).
+        points = np.asarray(points) ; crease_array = self.bloom.crease_array
+        flat_lengths = np.linalg.norm(self.flat_coordinates[crease_array[:,0]] - self.flat_coordinates[crease_array[:,1]], axis=1)
+        lengths = np.linalg.norm(points[..., crease_array[:,0], :] - points[..., crease_array[:,1], :], axis=-1)
+        return np.abs(lengths / flat_lengths - 1).reshape(len(points), -1).max(axis=1, initial=0)
+
+    def fold_angles(self, points): # (T,K) signed fold angles of the hinges, for points (T,M,N,3).
+        points = np.asarray(points) ; vertex_count = points.shape[2]
+        points = np.concatenate((points.reshape(len(points), -1, 3), np.zeros((len(points), 1, 3))), axis=1) # the origin, as point M*N.
+        hinge_points = np.where(self.hinge_array[...,1] == vertex_count, self.bloom.M * vertex_count, self.hinge_array[...,0] * vertex_count + self.hinge_array[...,1])
+        return self.hinge_fold_angles(*np.moveaxis(points[:, hinge_points], 2, 0))
+
+    def fold_angle_error(self, points, t): # (T,) largest difference between the fold angle of a hinge and its target, for points (T,M,N,3) folded at the fold parameters t (T,).
+        target_angles = self.crease_fold_angles(np.asarray(t, dtype=float).reshape(-1))[:, self.hinge_crease_array]
+        return np.abs((self.fold_angles(points) - target_angles + np.pi) % (2*np.pi) - np.pi).max(axis=1, initial=0)
+
+    def fold_direction_error(self, points, t): # (T,) largest angle by which a hinge folds against its crease, e.g. a valley crease folded as a mountain, for points (T,M,N,3) folded at t (T,).
+        # a hinge folded on past flat reads as folded the other way, and counts as reversed.
+        target_signs = np.sign(self.crease_fold_angles(np.asarray(t, dtype=float).reshape(-1))[:, self.hinge_crease_array])
+        return np.maximum(-target_signs * self.fold_angles(points), 0).max(axis=1, initial=0)
+
+    def closure_error(self, points): # (T,) largest distance between the folded copies of a point that are welded together in the flat pattern, for points (T,M,N,3).
+        points = np.asarray(points) ; points = points.reshape((-1, self.bloom.M * len(self.flat_coordinates), 3))
+        _, welded_vertices = self.bloom.weld_vertices()
+        _, first_points = np.unique(welded_vertices, return_index=True)
+        return np.linalg.norm(points - points[:, first_points[welded_vertices]], axis=2).max(axis=1)
+
+    '''PLOTTING'''
+    def plot_folded_state(self, points): # plots one folded state (M,N,3) with the facets in lime and the central polygon in yellow.
+        from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+        bloom = self.bloom ; central_polygon = bloom.point_vertex_ids(((0,0,0),))[0]
+        graph = bloom.pyplot().figure().add_subplot(projection="3d")
+        polygons = [points[:, central_polygon]] + list(points[:, bloom.facet_array].reshape(-1,3,3))
+        facecolors = ['yellow'] + ['lime'] * (len(polygons) - 1)
+        graph.add_collection3d(Poly3DCollection(polygons, facecolors=facecolors, edgecolors="black", linewidths=0.3*bloom.line_width))
+        low, high = points.reshape(-1,3).min(axis=0), points.reshape(-1,3).max(axis=0) ; center, radius = (low + high) / 2, (high - low).max() / 2
+        graph.set_xlim(center[0] - radius, center[0] + radius) ; graph.set_ylim(center[1] - radius, center[1] + radius) ; graph.set_zlim(center[2] - radius, center[2] + radius)
+        graph.set_box_aspect((1,1,1))
+        bloom.show_plot()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Fold a Yoshimura bloom pattern RH-Y-m.h from flat to t = 1, and time the whole sequence of frames.")
+    parser.add_argument("-m", type=integer_values, default=[6], help="number of sides of the central polygon, integer >= 4. Default 6.")
+    parser.add_argument("--h", type=integer_values, default=[2], help="height order of the pattern, integer >= 0. Default 2.")
+    parser.add_argument("-s", type=float, default=1.0, help="scale of the pattern, decimal > 0. Default 1.")
+    parser.add_argument("--frames", type=int, default=200, help="number of folded states from flat to t = 1. Default 200.")
+    parser.add_argument("--mountain-angle", type=float, default=180.0, help="fold angle of mountain creases at t = 1, in degrees. Default 180.")
+    parser.add_argument("--valley-angle", type=float, default=180.0, help="fold angle of valley creases at t = 1, in degrees. Default 180.")
+    parser.add_argument("--invert-creases", action="store_true", help="invert the mountain/valley assignment of creases.")
+    parser.add_argument("--show", type=float, default=None, metavar="T", help="plot the folded state at this t for the last pattern.")
+    args = parser.parse_args(arguments)
+    for m in args.m:
+        for h in args.h:
+            bloom = Bloom_Yoshimura.Bloom_Yoshimura(m,h,args.s) # M,H,S
+            bloom.crease_is_invert = args.invert_creases
+            bloom.compute()
+            start = time.perf_counter()
+            model = Bloom_Folding(bloom, np.radians(args.mountain_angle), np.radians(args.valley_angle))
+            try: frames = model.frames(args.frames)
+            except Folding_Error as error: print(error) ; continue
+            seconds = time.perf_counter() - start
+            t = np.linspace(0, 1, len(frames)) ; is_reversed = model.fold_direction_error(frames, t) > model.direction_tolerance
+            print("m={:<3} h={:<3} {:>5} frames of {:>7} points  {:8.4f} s  largest closure error {:.4g}  largest strain {:.4g}  largest fold angle error {:.1f} degrees  {}".format(
+                  m, h, len(frames), m * len(bloom.point_coordinates), seconds, model.closure_error(frames).max(), model.strain(frames).max(),
+                  np.degrees(model.fold_angle_error(frames, t).max(initial=0)), "folds reversed from t = {:.4g}".format(t[is_reversed][0]) if is_reversed.any() else "no fold reversed"))
+    if args.show is not None:
+        try: model.plot_folded_state(model.fold(args.show))
+        except Folding_Error as error: print(error)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+'''
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+RENDER SERVICE:
+
+A small local HTTP service that renders Yoshimura bloom patterns RH-Y-m.h on request, for design tools that embed the program.
+
+    python service.py --port 8000 --workers 4
+    curl "http://127.0.0.1:8000/pattern?m=6&h=2&s=1&format=svg&colored=1&facets=1" -o RH-Y-6.2.svg
+
+GET /pattern takes m, h and s, the format (svg, png, pdf, dxf or fold; default svg) and the display options of settings.py:
+origin, points, facets, lines (1 or 0; lines default to 1), line_width, colored and invert. GET /health returns the state of the service as JSON.
+
+Patterns are rendered on a bounded pool of worker processes, as batch.py renders them. Responses are kept in an LRU cache keyed by
+the normalized request, so repeated requests are answered without rendering, and identical requests that arrive while a pattern is
+being rendered wait for the same render. Every response has an ETag: a request with a matching If-None-Match gets 304 Not Modified.
+When the workers and the queue are full, new renders are refused with 503 Service Unavailable and a Retry-After header.
+A pool whose worker died (e.g. killed when out of memory) is replaced by a new one.
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+'''
+import argparse
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import Bloom_Yoshimura
+from batch import render_pattern
+
+
+service_version = 1 # part of every cache key and ETag; increase it when the rendering changes.
+CONTENT_TYPES = {"svg": "image/svg+xml", "png": "image/png", "pdf": "application/pdf", "dxf": "application/dxf", "fold": "application/json"}
+# largest number of points rendered per format, about 30 s of one worker: rendering with every display option on took
+# 300 us per point for svg, 230 for pdf, 105 for png and under 10 for dxf and fold (RH-Y-64.50, 88064 points); dxf and fold are limited by their size instead.
+MAX_POINTS = {"svg": 100000, "png": 250000, "pdf": 100000, "dxf": 1000000, "fold": 1000000}
+FLAGS = {"origin": "show_origin", "points": "show_points", "facets": "show_facets", "lines": "show_lines", "colored": "line_style", "invert": "invert_creases"}
+
+
+class Request_Error(ValueError): pass # a request with missing or invalid parameters (400 Bad Request).
+
+
+def parse_request(query): # normalized (m, h, s, format, options) of a query string, or Request_Error.
+    parameters = {name: values[-1] for name, values in parse_qs(query).items()}
+    def number(name, value_type, default = None):
+        if name not in parameters:
+            if default is None: raise Request_Error("missing parameter: {}".format(name))
+            return default
+        try: return value_type(parameters[name])
+        except ValueError: raise Request_Error("invalid {}: {}".format(name, parameters[name]))
+    m, h, s = number("m", int), number("h", int), number("s", float, 1.0)
+    if m < 4: raise Request_Error("m must be an integer greater than or equal to 4.")
+    if h < 0: raise Request_Error("h must be an integer greater than or equal to 0.")
+    if not 0 < s < float("inf"): raise Request_Error("s must be a decimal greater than 0.")
+    file_format = parameters.get("format", "svg")
+    if file_format not in CONTENT_TYPES: raise Request_Error("format must be one of {}.".format(", ".join(CONTENT_TYPES)))
+    options = {option: bool(number(name, int, 1 if name == "lines" else 0)) for name, option in FLAGS.items()}
+    options["line_width"] = number("line_width", float, 1.0)
+    if not 0 < options["line_width"] < float("inf"): raise Request_Error("line_width must be a decimal greater than 0.")
+    return m, h, s, file_format, options
+
+
+def render(request, cache_dir = None): # renders one normalized request in a worker process, and returns the file contents.
+    m, h, s, file_format, options = request
+    with tempfile.TemporaryDirectory() as output_dir:
+        file_name, = render_pattern((m, h, s, dict(options, formats=[file_format], output_dir=output_dir, cache_dir=cache_dir)))
+        with open(file_name, "rb") as file: return file.read()
+
+
+class Response_Cache: # thread-safe LRU cache of rendered files, bounded by their total size in bytes.
+    def __init__(self, max_bytes = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict() # key --> bytes, least recently used first
+        self.size = 0 ; self.hits = 0 ; self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None: self.misses += 1 ; return None
+            self.entries.move_to_end(key) ; self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes: return
+        with self.lock:
+            if key in self.entries: self.size -= len(self.entries.pop(key))
+            self.entries[key] = body ; self.size += len(body)
+            while self.size > self.max_bytes: self.size -= len(self.entries.popitem(last=False)[1])
+
+
+class Render_Service: # renders requests on a bounded process pool, through the response cache.
+    def __init__(self, workers = os.cpu_count(), queue_size = 64, cache_bytes = 256 * 2**20, cache_dir = None, timeout = 300, max_points = None):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers + queue_size) # renders running or waiting for a worker; beyond that, requests are refused.
+        self.cache = Response_Cache(cache_bytes)
+        self.cache_dir = cache_dir # geometry cache directory shared by the workers, see Bloom_Yoshimura.Pattern_Cache.
+        self.timeout = timeout # seconds a request waits for its render.
+        self.max_points = dict(MAX_POINTS) if max_points is None else dict.fromkeys(CONTENT_TYPES, max_points) # format --> largest pattern rendered, so that one request cannot hold a worker for minutes.
+        self.pending = dict() # key --> future of the renders in progress, shared by identical requests.
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(request): return json.dumps([service_version, Bloom_Yoshimura.Pattern_Cache.version, request], sort_keys=True)
+
+    @staticmethod
+    def etag(key): return '"{}"'.format(hashlib.sha1(key.encode()).hexdigest()) # the same request always renders the same pattern, so the ETag only depends on the request.
+
+    @staticmethod
+    def points(request): m, h = request[:2] ; return m * (h * h + 5 * h + 2) // 2 # number of points of the pattern, see sweep.py.
+
+    def get(self, request): # (body, "hit" or "miss"), or None if the service is full.
+        key = self.key(request)
+        body = self.cache.get(key)
+        if body is not None: return body, "hit"
+        with self.lock:
+            future = self.pending.get(key) ; is_new = future is None
+            if is_new:
+                if not self.slots.acquire(blocking=False): return None
+                try: future, executor = self.submit(request)
+                except BaseException: self.slots.release() ; raise # e.g. after shutdown(); the request fails with 500.
+                self.pending[key] = future
+        # outside the lock: a render that has already finished calls finish() at once, in this thread, and finish() takes the lock.
+        if is_new: future.add_done_callback(lambda future: self.finish(key, future, executor))
+        return future.result(timeout=self.timeout), "miss"
+
+    def submit(self, request): # (future, executor) of a new render; called with the lock held.
+        try: return self.executor.submit(render, request, self.cache_dir), self.executor
+        except BrokenProcessPool: # a worker died (e.g. killed when out of memory) before this request: render it on a new pool.
+            self.replace_executor(self.executor)
+            return self.executor.submit(render, request, self.cache_dir), self.executor
+
+    def replace_executor(self, executor): # replaces a broken pool by a new one, once; called with the lock held.
+        if self.executor is not executor: return
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def finish(self, key, future, executor): # caches the rendered file and frees its slot.
+        error = None if future.cancelled() else future.exception()
+        if not future.cancelled() and error is None: self.cache.put(key, future.result())
+        with self.lock:
+            del self.pending[key]
+            if isinstance(error, BrokenProcessPool): self.replace_executor(executor) # the worker died during the render, and the pool with it.
+        self.slots.release()
+
+    def health(self):
+        cache = self.cache
+        return {"cached_responses": len(cache.entries), "cache_bytes": cache.size, "cache_hits": cache.hits, "cache_misses": cache.misses, "renders_in_progress": len(self.pending)}
+
+    def shutdown(self): self.executor.shutdown(cancel_futures=True)
+
+
+class Request_Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive connections
+    service = None # the Render_Service, set by serve()
+    quiet = True # do not log every request
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health": return self.respond(200, json.dumps(self.service.health()).encode(), "application/json")
+        if url.path != "/pattern": return self.respond(404, b"not found: use /pattern?m=6&h=2&s=1&format=svg\n")
+        try: request = parse_request(url.query)
+        except Request_Error as error: return self.respond(400, "{}\n".format(error).encode())
+        max_points = self.service.max_points[request[3]]
+        if self.service.points(request) > max_points: return self.respond(400, "pattern too large: more than {} points for {} files.\n".format(max_points, request[3]).encode())
+        etag = self.service.etag(self.service.key(request))
+        if etag in self.headers.get("If-None-Match", ""): return self.respond(304, b"", headers={"ETag": etag})
+        try: result = self.service.get(request)
+        except Exception as error: return self.respond(500, "rendering failed: {}\n".format(error).encode())
+        if result is None: return self.respond(503, b"too many renders in progress, try again later\n", headers={"Retry-After": "1"})
+        body, cache_status = result
+        self.respond(200, body, CONTENT_TYPES[request[3]], {"ETag": etag, "Cache-Control": "max-age=3600", "X-Cache": cache_status})
+
+    def respond(self, status, body, content_type = "text/plain; charset=utf-8", headers = {}):
+        self.send_response(status)
+        if status != 304: self.send_header("Content-Type", content_type) ; self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items(): self.send_header(name, value)
+        self.end_headers()
+        if status != 304: self.wfile.write(body)
+
+    def log_message(self, format, *arguments):
+        if not self.quiet: super().log_message(format, *arguments)
+
+
+class Render_Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024 # connections waiting to be accepted
+
+
+def serve(host = "127.0.0.1", port = 8000, service = None, quiet = True): # returns a server handling requests with its own handler class; call serve_forever() on it.
+    handler = type("Handler", (Request_Handler,), {"service": service or Render_Service(), "quiet": quiet})
+    return Render_Server((host, port), handler)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve Yoshimura bloom patterns RH-Y-m.h as svg, png, pdf, dxf or fold files over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on. Default 127.0.0.1 (this machine only).")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on. Default 8000.")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes. Default: number of CPUs.")
+    parser.add_argument("--queue-size", type=int, default=64, help="renders that may wait for a worker before new ones are refused with 503. Default 64.")
+    parser.add_argument("--cache-size", type=float, default=256, help="size of the response cache, in MB. Default 256.")
+    parser.add_argument("--cache-dir", default=None, help="directory to cache computed (m, h) geometry in, shared between workers and runs. Default: no disk cache.")
+    parser.add_argument("--max-points", type=int, default=None, help="largest number of points of a rendered pattern, for every format. Default: {}.".format(", ".join("{} for {}".format(points, file_format) for file_format, points in MAX_POINTS.items())))
+    parser.add_argument("--verbose", action="store_true", help="log every request.")
+    args = parser.parse_args(arguments)
+    if args.workers < 1: parser.error("the number of workers must be at least 1.")
+    if args.queue_size < 0: parser.error("the queue size must be at least 0.")
+    service = Render_Service(args.workers, args.queue_size, int(args.cache_size * 2**20), args.cache_dir, max_points=args.max_points)
+    server = serve(args.host, args.port, service, quiet=not args.verbose)
+    print("serving on http://{}:{}/pattern?m=6&h=2&s=1&format=svg".format(args.host, args.port))
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
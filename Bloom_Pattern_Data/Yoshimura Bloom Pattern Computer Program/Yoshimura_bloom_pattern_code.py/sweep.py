@@ -0,0 +1,140 @@
+'''
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+SWEEP:
+
+Screens a grid of Yoshimura bloom patterns RH-Y-m.h at scale s without building them: whether each (m, h, s) gives a valid pattern,
+and its geometry, from closed-form expressions evaluated on whole arrays of parameters at once.
+
+    python sweep.py -m 4:1000 --h 0:1000 -s 1,2.5 -o sweep.npy
+    python sweep.py -m 4:12 --h 0:5 -o sweep.csv --verify
+
+The table has one row per (m, h, s), with the fields listed in FIELDS. Counts and lengths are those of the whole pattern,
+with the creases and points that neighboring wedges share counted once, as in export_fold. Large grids are split into chunks
+that are evaluated in parallel on a pool of worker processes. --verify compares the expressions with the patterns built by
+Bloom_Yoshimura for every (m, h) of the grid up to --verify-limit points.
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+'''
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import Bloom_Yoshimura
+from batch import integer_values, decimal_values
+
+
+FIELDS = (("m", np.float64), ("h", np.float64), ("s", np.float64), ("valid", np.bool_), # m and h are stored as given, so invalid non-integer values stay visible.
+          ("alpha_angle", np.float64), # 2pi/m, the angle of one wedge
+          ("height_length", np.float64), # 1 / 2tan(alpha/2), the distance from the origin to a side of the central polygon at scale 1
+          ("outer_radius", np.float64), # distance from the origin to the farthest point, at scale s
+          ("points", np.int64), ("facets", np.int64), # the facets include the central polygon
+          ("edges", np.int64), ("mountain_creases", np.int64), ("valley_creases", np.int64),
+          ("edge_length", np.float64), ("mountain_length", np.float64), ("valley_length", np.float64),
+          ("total_crease_length", np.float64), # mountain and valley creases, without edges, at scale s
+          ("mountain_valley_balance", np.int64)) # number of mountain creases minus number of valley creases
+SWEEP_DTYPE = np.dtype(list(FIELDS))
+sweep_chunk_size = 1000000 # rows evaluated by one worker process at a time.
+
+
+def is_valid(m, h, s): # m is an integer >= 4, h is an integer >= 0 and s is a decimal > 0, as in settings.py.
+    m, h, s = np.asarray(m, dtype=float), np.asarray(h, dtype=float), np.asarray(s, dtype=float)
+    return (m >= 4) & (m == np.round(m)) & (h >= 0) & (h == np.round(h)) & np.isfinite(s) & (s > 0)
+
+
+def sweep(m, h, s = 1.0, crease_is_invert = False): # structured array (SWEEP_DTYPE) of the patterns (m, h, s); m, h and s are broadcast against each other.
+    m, h, s = np.broadcast_arrays(np.asarray(m, dtype=float), np.asarray(h, dtype=float), np.asarray(s, dtype=float))
+    table = np.zeros(m.shape, dtype=SWEEP_DTYPE)
+    table["m"], table["h"], table["s"] = m, h, s
+    valid = table["valid"] = is_valid(m, h, s)
+    M = np.where(valid, m, 4).astype(np.int64) ; H = np.where(valid, h, 0).astype(np.int64) ; S = np.where(valid, s, 1.0) # invalid rows are computed with harmless values and cleared below.
+    alpha = 2 * np.pi / M ; height_length = 1 / (2 * np.tan(alpha / 2))
+    table["alpha_angle"], table["height_length"] = alpha, height_length
+    # wedge 0 is the lattice p(i,j) --> (i - 1/2 + j cos(alpha), height_length + j sin(alpha)); its farthest points are corners of the wedge: p(H+1,0), p(0,H) and p(1,H).
+    corner_x = np.stack((H + 0.5, H * np.cos(alpha) - 0.5, H * np.cos(alpha) + 0.5)) ; corner_y = np.stack((height_length, height_length + H * np.sin(alpha), height_length + H * np.sin(alpha)))
+    table["outer_radius"] = S * np.hypot(corner_x, corner_y).max(axis=0)
+    # per wedge: (H+1)(H+4)/2 full-length and H half-length points, of which the H+1 points p(0,j) are shared with the previous wedge;
+    # 2H+1 edges, H(H+3) orthogonal creases, of which the H creases p(0,j)--p(0,j+1) are shared, H(H+3)/2 diagonal creases and H(H+3) facets.
+    orthogonal_creases = M * H * (H + 2) ; diagonal_creases = M * H * (H + 3) // 2
+    orthogonal_length = S * orthogonal_creases # orthogonal creases have length 1.
+    diagonal_length = S * M * H * (H + 2) * np.cos(alpha / 2) # full-length diagonals have length 2cos(alpha/2) and half-length diagonals cos(alpha/2).
+    table["points"] = M * (H * H + 5 * H + 2) // 2
+    table["facets"] = M * H * (H + 3) + 1
+    table["edges"] = M * (2 * H + 1)
+    table["edge_length"] = S * M * (1 + 2 * H * np.sin(alpha / 2)) # the top edge has length 1 and the 2H half-length negative diagonals sin(alpha/2).
+    if not crease_is_invert: # diagonal creases are mountain folds and orthogonal creases are valley folds.
+        table["mountain_creases"], table["valley_creases"], table["mountain_length"], table["valley_length"] = diagonal_creases, orthogonal_creases, diagonal_length, orthogonal_length
+    else:
+        table["mountain_creases"], table["valley_creases"], table["mountain_length"], table["valley_length"] = orthogonal_creases, diagonal_creases, orthogonal_length, diagonal_length
+    table["total_crease_length"] = orthogonal_length + diagonal_length
+    table["mountain_valley_balance"] = table["mountain_creases"] - table["valley_creases"]
+    for name, _ in FIELDS[4:]: table[name][~valid] = 0
+    return table
+
+
+def sweep_chunk(arguments): return sweep(*arguments)
+
+
+def parallel_sweep(m, h, s = 1.0, crease_is_invert = False, workers = None): # same as sweep, with chunks of sweep_chunk_size rows evaluated on a pool of worker processes.
+    m, h, s = np.broadcast_arrays(np.asarray(m), np.asarray(h), np.asarray(s, dtype=float))
+    shape = m.shape ; m, h, s = m.ravel(), h.ravel(), s.ravel()
+    if len(m) <= sweep_chunk_size or workers == 1: return sweep(m, h, s, crease_is_invert).reshape(shape)
+    chunks = [(m[start:start+sweep_chunk_size], h[start:start+sweep_chunk_size], s[start:start+sweep_chunk_size], crease_is_invert) for start in range(0, len(m), sweep_chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(sweep_chunk, chunks))).reshape(shape)
+
+
+def grid(m_values, h_values, s_values): # (m, h, s) arrays of every combination of the values, m varying slowest.
+    return [array.ravel() for array in np.meshgrid(m_values, h_values, s_values, indexing="ij")]
+
+
+def pattern_table(bloom): # the sweep fields of a computed Bloom_Yoshimura pattern, measured on its welded mesh.
+    vertex_coordinates, edges, edge_types, central_polygon, facets = bloom.welded_mesh()
+    lengths = np.linalg.norm(vertex_coordinates[edges[:,0]] - vertex_coordinates[edges[:,1]], axis=1)
+    mountain_type, valley_type = (bloom.DIAGONAL_CREASE, bloom.ORTHOGONAL_CREASE) if not bloom.crease_is_invert else (bloom.ORTHOGONAL_CREASE, bloom.DIAGONAL_CREASE)
+    return {"alpha_angle": bloom.alpha_angle, "height_length": bloom.height_length, "outer_radius": np.linalg.norm(vertex_coordinates, axis=1).max(),
+            "points": len(vertex_coordinates), "facets": len(facets) + 1, "edges": int((edge_types == bloom.EDGE).sum()),
+            "mountain_creases": int((edge_types == mountain_type).sum()), "valley_creases": int((edge_types == valley_type).sum()),
+            "edge_length": lengths[edge_types == bloom.EDGE].sum(), "mountain_length": lengths[edge_types == mountain_type].sum(),
+            "valley_length": lengths[edge_types == valley_type].sum(), "total_crease_length": lengths[edge_types != bloom.EDGE].sum(),
+            "mountain_valley_balance": int((edge_types == mountain_type).sum() - (edge_types == valley_type).sum())}
+
+
+def verify(table, point_limit = 100000, crease_is_invert = False): # compares each valid row of a sweep table, up to point_limit points, with the pattern built by Bloom_Yoshimura. Returns the mismatches.
+    mismatches = list() ; checked = set()
+    for row in table[table["valid"] & (table["points"] <= point_limit)]:
+        m, h, s = int(row["m"]), int(row["h"]), float(row["s"])
+        if (m, h, s) in checked: continue
+        checked.add((m, h, s))
+        bloom = Bloom_Yoshimura.Bloom_Yoshimura(m,h,s) ; bloom.crease_is_invert = crease_is_invert ; bloom.compute()
+        for name, value in pattern_table(bloom).items():
+            if not np.isclose(row[name], value, rtol=1e-9, atol=1e-9 * s): mismatches.append((m, h, s, name, row[name], value))
+    return mismatches
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Screen the validity and geometry of a grid of Yoshimura bloom patterns RH-Y-m.h without building them.")
+    parser.add_argument("-m", type=integer_values, required=True, help="number of sides of the central polygon.")
+    parser.add_argument("--h", type=integer_values, required=True, help="height order of the pattern.")
+    parser.add_argument("-s", type=decimal_values, default=[1.0], help="scale of the pattern. Default 1.")
+    parser.add_argument("--invert-creases", action="store_true", help="invert the mountain/valley assignment of creases.")
+    parser.add_argument("-o", "--output", default=None, help="file to write the table to, .npy (structured array) or .csv. Default: print a summary only.")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes for grids larger than one chunk. Default: number of CPUs.")
+    parser.add_argument("--verify", action="store_true", help="build the patterns of the grid and compare them with the table.")
+    parser.add_argument("--verify-limit", type=int, default=100000, help="largest number of points of a pattern built by --verify. Default 100000.")
+    args = parser.parse_args(arguments)
+    if args.workers < 1: parser.error("the number of workers must be at least 1.")
+    table = parallel_sweep(*grid(args.m, args.h, args.s), crease_is_invert=args.invert_creases, workers=args.workers)
+    print("{} patterns, {} valid.".format(len(table), int(table["valid"].sum())))
+    if args.output and args.output.endswith(".csv"):
+        names = [name for name, _ in FIELDS] ; formats = ["%d" if np.issubdtype(dtype, np.integer) or dtype is np.bool_ else "%.9g" for _, dtype in FIELDS]
+        np.savetxt(args.output, table, fmt=formats, delimiter=",", header=",".join(names), comments="")
+    elif args.output: np.save(args.output, table)
+    if args.output: print("table written to {}".format(args.output))
+    if args.verify:
+        mismatches = verify(table, args.verify_limit, args.invert_creases)
+        for mismatch in mismatches[:20]: print("mismatch: m={} h={} s={:g} {}: table {} pattern {}".format(*mismatch))
+        print("verified: {} mismatches.".format(len(mismatches)))
+
+
+if __name__ == "__main__":
+    main()
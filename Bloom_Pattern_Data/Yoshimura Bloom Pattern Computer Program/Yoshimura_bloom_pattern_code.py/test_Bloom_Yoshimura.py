@@ -0,0 +1,176 @@
+'''regression tests of Bloom_Yoshimura.py, run with "python -m pytest" from this directory.'''
+
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import numpy as np
+import pytest
+import Bloom_Yoshimura
+
+
+def computed_pattern(M, H, S = 1):
+    bloom = Bloom_Yoshimura.Bloom_Yoshimura(M,H,S)
+    bloom.cache = None # every stage does its full work.
+    bloom.compute()
+    return bloom
+
+
+def quadratic_facet_set(crease_set): # the original search of define_facet_set: every pair of creases sharing a point, closed by a third crease.
+    facet_set = set()
+    for crease in crease_set:
+        p1,p2 = crease
+        # Search the crease set for two other lines that satisfy {p1,p2},{p2,p3},{p1,p3}.
+        for crease_2 in crease_set:
+            p3,p4 = crease_2
+            if p1==p3:
+                crease_3 = {p2,p4}
+                if crease_3 in crease_set:
+                    facet = frozenset({p1,p2,p4})
+                    facet_set.add(facet)
+    return facet_set
+
+
+@pytest.mark.parametrize("M", (4,5,6,9,16))
+@pytest.mark.parametrize("H", range(0,13))
+def test_facet_set_matches_quadratic_search(M, H):
+    bloom = computed_pattern(M, H)
+    wedge_crease_set, wedge_facet_set = set(bloom.crease_set.wedge_set), set(bloom.facet_set.wedge_set)
+    assert len(wedge_facet_set) == len(bloom.facet_array) == H*(H+3) # no facet is found twice.
+    assert wedge_facet_set == quadratic_facet_set(wedge_crease_set)
+    assert set(bloom.facet_set) == {Bloom_Yoshimura.Radial_Set.mirror(facet, k) for facet in wedge_facet_set for k in bloom.k_sequence}
+
+
+@pytest.mark.parametrize("M, H", ((4,0), (6,2), (9,7)))
+def test_membership_of_lazy_sets(M, H):
+    bloom = computed_pattern(M, H)
+    for lazy_set in (bloom.point_set, bloom.crease_set, bloom.edge_set, bloom.orthogonal_crease_set, bloom.diagonal_crease_set, bloom.facet_set):
+        elements = set(lazy_set)
+        assert all(element in lazy_set for element in elements)
+        assert len(elements) == len(lazy_set)
+    points = list(bloom.point_set.wedge_set)
+    non_creases = {frozenset((p1, p2)) for p1 in points for p2 in points if p1 != p2} - set(bloom.crease_set.wedge_set)
+    assert not any(crease in bloom.crease_set for crease in non_creases)
+    assert (H+2, 0, 0) not in bloom.point_set and (0, 0, M) not in bloom.point_set
+    assert frozenset({(0,0,0), (1,0,1)}) not in bloom.crease_set # points of two wedges are never a crease.
+    assert (1.2, 0, 0) not in bloom.point_set and frozenset({(0.1,0,0), (1.1,0,0)}) not in bloom.crease_set # only multiples of 1/2 are points.
+    with pytest.raises(KeyError): bloom.point_map_read((1.2, 0, 0))
+
+
+def cached_pattern(cache, M, H, S = 1): # a pattern computed through cache, with a monitor of its stages.
+    bloom = Bloom_Yoshimura.Bloom_Yoshimura(M,H,S)
+    bloom.cache = cache ; bloom.monitor = Bloom_Yoshimura.Stage_Monitor()
+    bloom.compute()
+    return bloom
+
+
+def test_cached_wedge_skips_the_geometry_stages():
+    cache = Bloom_Yoshimura.Pattern_Cache()
+    cold = cached_pattern(cache, 6, 3)
+    warm = cached_pattern(cache, 6, 3, 2.5) # another scale shares the unit-scale wedge.
+    assert [record["stage"] for record in cold.monitor.records][:2] == ["load_cached_wedge", "define_point_set"]
+    stages = [record["stage"] for record in warm.monitor.records]
+    assert stages[0] == "load_cached_wedge" and "define_point_set" not in stages and "store_cached_wedge" not in stages
+    assert abs(warm.point_coordinates - 2.5 * cold.point_coordinates).max() < 1e-12
+
+
+def test_disk_cache_is_shared_by_new_caches(tmp_path):
+    cached_pattern(Bloom_Yoshimura.Pattern_Cache(cache_dir = tmp_path), 7, 4)
+    assert [file.name for file in tmp_path.iterdir()] == ["yoshimura_v{}_M7_H4.npz".format(Bloom_Yoshimura.Pattern_Cache.version)] # no temporary file is left.
+    bloom = cached_pattern(Bloom_Yoshimura.Pattern_Cache(cache_dir = tmp_path), 7, 4, 2.5)
+    assert "define_point_set" not in [record["stage"] for record in bloom.monitor.records]
+    assert abs(bloom.point_coordinates - 2.5 * computed_pattern(7, 4).point_coordinates).max() < 1e-12
+    assert (bloom.crease_array == computed_pattern(7, 4).crease_array).all()
+
+
+def test_cache_evicts_the_least_recently_used_patterns():
+    cache = Bloom_Yoshimura.Pattern_Cache()
+    cached_pattern(cache, 6, 5) ; entry_bytes = cache.size_bytes
+    cache.max_bytes = 2 * entry_bytes
+    for M in (7, 8, 9): cached_pattern(cache, M, 5) # the wedges of (M, 5) all have the same size.
+    assert cache.size_bytes <= cache.max_bytes and list(cache.entries) == [cache.key(8, 5), cache.key(9, 5)]
+    assert cache.get(6, 5) is None and cache.get(9, 5) is not None
+
+
+def test_stage_monitor_records_every_stage(tmp_path):
+    bloom = Bloom_Yoshimura.Bloom_Yoshimura(6,2,1)
+    bloom.cache = None ; bloom.monitor = Bloom_Yoshimura.Stage_Monitor(trace_memory=True)
+    stages = list()
+    bloom.monitor.add_before_callback(lambda bloom, stage: stages.append(stage))
+    bloom.monitor.add_after_callback(lambda bloom, stage, record: stages.append(record["facets"]), "define_facet_set")
+    bloom.compute()
+    assert [record["stage"] for record in bloom.monitor.records] == [stage for stage in stages if isinstance(stage, str)]
+    assert stages[stages.index("define_facet_set") + 1] == 10 and bloom.monitor.records[-1]["creases"] == len(bloom.crease_set)
+    assert all(record["peak_bytes"] >= 0 for record in bloom.monitor.records) and not tracemalloc.is_tracing()
+    summary_stages = [line.split()[0] for line in bloom.monitor.summary().splitlines()[1:-1]]
+    assert summary_stages == [record["stage"] for record in sorted(bloom.monitor.records, key=lambda record: record["seconds"])] # slowest last
+    bloom.monitor.dump_json(tmp_path / "stages.json")
+    assert json.loads((tmp_path / "stages.json").read_text()) == bloom.monitor.records
+
+
+def test_stage_monitor_stops_tracing_when_a_stage_raises():
+    bloom = computed_pattern(6, 2)
+    bloom.monitor = Bloom_Yoshimura.Stage_Monitor(trace_memory=True)
+    bloom.crease_type_array = np.full(len(bloom.crease_array), bloom.MISCLASSIFIED_CREASE, dtype=np.int8)
+    with pytest.raises(ValueError): bloom.run_stage(bloom.validate_crease_classification)
+    assert not tracemalloc.is_tracing() and bloom.monitor.records == []
+
+
+@pytest.mark.filterwarnings("ignore:FigureCanvasAgg is non-interactive")
+def test_display_options_restyle_the_plot_in_place():
+    plt = Bloom_Yoshimura.pyplot(headless = True)
+    from matplotlib.colors import same_color
+    bloom = computed_pattern(6, 2)
+    bloom.plot_lines = True ; bloom.line_style = 1
+    bloom.graph()
+    edges, orthogonal_creases, diagonal_creases = (bloom.artists[layer][0] for layer in ("edges", "orthogonal_creases", "diagonal_creases"))
+    assert same_color(orthogonal_creases.get_color(), "red") and same_color(diagonal_creases.get_color(), "blue")
+    bloom.invert_crease_mountain_valley_assignment()
+    assert bloom.artists["orthogonal_creases"] == [orthogonal_creases] and bloom.artists["diagonal_creases"] == [diagonal_creases]
+    assert same_color(orthogonal_creases.get_color(), "blue") and same_color(diagonal_creases.get_color(), "red")
+    bloom.line_style = 0 ; bloom.graph()
+    assert bloom.artists["edges"] == [edges] and all(same_color(artist.get_color(), "black") for artist in (edges, orthogonal_creases, diagonal_creases))
+    assert orthogonal_creases.get_linestyle()[0][1] is None and diagonal_creases.get_linestyle()[0][1] is not None # inverted: orthogonal creases are solid mountain folds.
+    assert edges.get_linewidth()[0] == pytest.approx(1.3)
+    bloom.plot_facets = True ; bloom.plot_lines = False ; bloom.graph()
+    assert bloom.artists["edges"] == [edges] and not edges.get_visible() and bloom.artists["facets"][0].get_visible()
+    bloom.S = 2 ; bloom.graph() # the geometry changed: the plot is drawn again.
+    assert "edges" not in bloom.artists and edges.axes is None and bloom.artists["facets"][0].get_paths()[0].vertices.max() > 1.5
+    plt.close("all")
+
+
+@pytest.mark.filterwarnings("ignore:FigureCanvasAgg is non-interactive")
+def test_point_labels_are_culled_to_the_view():
+    plt = Bloom_Yoshimura.pyplot(headless = True)
+    bloom = computed_pattern(18, 10)
+    bloom.plot_points = True
+    bloom.graph()
+    graph = bloom.artists["points"][0].axes
+    assert len(bloom.point_set) > bloom.point_label_limit and bloom.artists["point_labels"] == [] # too many points in view.
+    x, y = bloom.point_map_read((0,10,0)) # a corner of wedges 0 and 1.
+    graph.set_xlim(x - 1, x + 1) ; graph.set_ylim(y - 1, y + 1)
+    labels = [label.get_text() for label in bloom.artists["point_labels"]]
+    assert 0 < len(labels) <= bloom.point_label_limit and {label.rsplit(",", 1)[1] for label in labels} == {"0)", "1)"}
+    bloom.label_one_wedge = True ; bloom.graph()
+    assert 0 < len(bloom.artists["point_labels"]) < len(labels) and all(label.get_text().endswith(",0)") for label in bloom.artists["point_labels"])
+    bloom.plot_points = False ; bloom.graph()
+    assert bloom.artists["point_labels"] == [] and not bloom.artists["points"][0].get_visible()
+    plt.close("all")
+
+
+@pytest.mark.parametrize("file_format", ("svg", "dxf", "fold"))
+def test_exports_follow_changed_parameters(file_format, tmp_path):
+    bloom = computed_pattern(6, 2)
+    bloom.M, bloom.H, bloom.S = 8, 3, 2.0
+    getattr(bloom, "export_" + file_format)(tmp_path / "changed")
+    getattr(computed_pattern(8, 3, 2.0), "export_" + file_format)(tmp_path / "fresh")
+    assert (tmp_path / "changed").read_bytes() == (tmp_path / "fresh").read_bytes()
+
+
+def test_compute_and_export_do_not_import_matplotlib():
+    program = ("import os, sys, Bloom_Yoshimura ; bloom = Bloom_Yoshimura.Bloom_Yoshimura(6,2,1) ; bloom.compute() ; "
+               "bloom.export_svg(os.devnull) ; bloom.export_dxf(os.devnull) ; bloom.export_fold(os.devnull) ; "
+               "assert 'matplotlib' not in sys.modules, sorted(name for name in sys.modules if name.startswith('matplotlib'))")
+    subprocess.run([sys.executable, "-c", program], check=True, cwd=os.path.dirname(os.path.abspath(Bloom_Yoshimura.__file__)))
@@ -0,0 +1,27 @@
+'''regression tests of batch.py, run with "python -m pytest" from this directory.'''
+
+import argparse
+
+import pytest
+import batch
+
+
+@pytest.mark.parametrize("text, values", (("6", [6]), ("4,6,8", [4,6,8]), ("4:8", [4,5,6,7,8]), ("1:4:2", [1,3]), ("4:7:2", [4,6]),
+                                          ("4:8:2", [4,6,8]), ("8:4", []), ("4:5,9", [4,5,9])))
+def test_integer_values(text, values):
+    assert batch.integer_values(text) == values
+
+
+@pytest.mark.parametrize("text, values", (("1:2:0.5", [1.0,1.5,2.0]), ("0:1:0.6", [0.0,0.6]), ("0:0.3:0.1", [0.0,0.1,0.2,0.3]), ("0.5", [0.5])))
+def test_decimal_values(text, values):
+    assert batch.decimal_values(text) == pytest.approx(values)
+
+
+def test_step_must_be_positive():
+    with pytest.raises(argparse.ArgumentTypeError): batch.integer_values("4:8:0")
+
+
+@pytest.mark.parametrize("arguments", (["-m", "8:4", "--h", "1"], ["-m", "6", "--h", "3:1"], ["-m", "6", "--h", "1", "-s", "2:1"]))
+def test_empty_ranges_are_rejected(arguments, tmp_path):
+    with pytest.raises(SystemExit) as exit_info: batch.main(arguments + ["-o", str(tmp_path)])
+    assert exit_info.value.code == 2 # argparse error, not a traceback.
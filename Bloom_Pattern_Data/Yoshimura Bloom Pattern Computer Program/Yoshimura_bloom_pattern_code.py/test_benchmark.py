@@ -0,0 +1,13 @@
+'''regression tests of benchmark.py, run with "python -m pytest" from this directory.'''
+
+import json
+
+import benchmark
+
+
+def test_benchmark_runs_every_stage_once(tmp_path):
+    output = tmp_path / "results.json"
+    benchmark.main(["-m","4","--h","1","--repeat","1","-o",str(output)])
+    results = json.loads(output.read_text())
+    assert [record["stage"] for record in results["results"]] == list(benchmark.STAGES)
+    assert set(results["cold_start"]) == {name for name, program in benchmark.COLD_START_PROGRAMS}
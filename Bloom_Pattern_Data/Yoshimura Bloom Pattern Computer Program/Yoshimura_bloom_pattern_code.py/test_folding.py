@@ -0,0 +1,69 @@
+'''regression tests of folding.py, run with "python -m pytest" from this directory.'''
+
+import numpy as np
+import pytest
+import Bloom_Yoshimura
+import folding
+
+
+def computed_pattern(M, H, S = 1):
+    bloom = Bloom_Yoshimura.Bloom_Yoshimura(M,H,S)
+    bloom.cache = None
+    bloom.compute()
+    return bloom
+
+
+@pytest.mark.parametrize("M, H", ((4,4), (6,2), (8,3)))
+def test_folded_wedges_stay_closed(M, H):
+    model = folding.Bloom_Folding(computed_pattern(M, H))
+    frames = model.frames(21)
+    assert abs(frames[0] - model.fold(0.0)).max() == 0 and abs(frames[0][..., 2]).max() == 0 # t = 0 is the flat pattern.
+    assert abs(frames[len(frames)//2][..., 2]).max() > 0.5 # the half folded pattern leaves the plane; fully folded, it may lie flat again.
+    assert model.closure_error(frames).max() < 1e-9
+    assert model.strain(frames).max() < model.strain_tolerance
+
+
+def test_block_tridiagonal_solve_matches_dense_solve():
+    sizes = 3 * folding.Bloom_Folding(computed_pattern(6, 5)).level_sizes ; size = sizes.max() ; levels = np.repeat(np.arange(len(sizes)), sizes)
+    random = np.random.default_rng(0)
+    matrix = random.normal(size=(2, len(levels), len(levels))) * (abs(np.subtract.outer(levels, levels)) <= 1) + len(levels) * np.identity(len(levels))
+    matrix = matrix + matrix.swapaxes(1,2) # J^T J is symmetric: only its lower blocks are stored.
+    right_side = random.normal(size=(2, len(levels)))
+    blocks = np.zeros((2, len(sizes), 2, size, size)) ; level_right_side = np.zeros((2, len(sizes), size))
+    for level in range(len(sizes)):
+        rows = levels == level ; level_right_side[:, level, :sizes[level]] = right_side[:, rows]
+        blocks[:, level, 0, :sizes[level], :sizes[level]] = matrix[:, rows][:, :, rows]
+        if level < len(sizes) - 1: blocks[:, level, 1, :sizes[level+1], :sizes[level]] = matrix[:, levels == level + 1][:, :, rows]
+    solution = folding.Bloom_Folding.solve_block_tridiagonal(blocks, level_right_side, sizes)
+    solution = np.concatenate([solution[:, level, :sizes[level]] for level in range(len(sizes))], axis=1)
+    assert abs(solution - np.linalg.solve(matrix, right_side[..., np.newaxis])[..., 0]).max() < 1e-9
+
+
+def test_stretched_folding_raises():
+    model = folding.Bloom_Folding(computed_pattern(8, 4))
+    model.strain_tolerance = 1e-4
+    with pytest.raises(folding.Folding_Error): model.frames(5)
+
+
+def test_show_of_a_stretched_pattern_is_reported(monkeypatch, capsys):
+    monkeypatch.setattr(folding.Bloom_Folding, "strain_tolerance", 1e-4)
+    folding.main(["-m", "8", "--h", "4", "--frames", "5", "--show", "0.5"])
+    assert capsys.readouterr().out.count("RH-Y-8.4:") == 2 # the frames and the shown state both fail, without a traceback.
+
+
+@pytest.mark.parametrize("M, H", ((6,2), (8,3)))
+def test_folds_follow_their_creases(M, H):
+    model = folding.Bloom_Folding(computed_pattern(M, H))
+    t = np.linspace(0, 0.6, 13) ; points = model.fold(t)
+    assert model.fold_direction_error(points, t).max() < model.direction_tolerance
+    angles = model.fold_angles(points)[1:] ; target_angles = model.crease_fold_angles(t[1:])[:, model.hinge_crease_array]
+    assert (np.sign(angles) == np.sign(target_angles)).all() # the central polygon and every crease between two facets are folded.
+    assert model.fold_angle_error(points[:1], t[:1]) == 0
+
+
+def test_reversed_folds_are_reported(capsys):
+    model = folding.Bloom_Folding(computed_pattern(6, 6))
+    t = np.array([0.25, 0.875]) ; points = model.fold(t)
+    assert (model.fold_direction_error(points, t) > model.direction_tolerance).all()
+    folding.main(["-m", "6", "--h", "6", "--frames", "9"])
+    assert "folds reversed from t = 0.25" in capsys.readouterr().out
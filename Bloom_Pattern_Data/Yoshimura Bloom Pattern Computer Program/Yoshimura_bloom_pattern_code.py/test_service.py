@@ -0,0 +1,63 @@
+'''regression tests of service.py, run with "python -m pytest" from this directory.'''
+
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import service
+
+
+class Finished_Executor: # renders that have already finished when submit returns.
+    def submit(self, function, *arguments):
+        future = Future() ; future.set_result(b"body") ; return future
+    def shutdown(self, **options): pass
+
+
+class Broken_Executor(Finished_Executor): # a pool whose worker died, e.g. killed when out of memory.
+    def submit(self, function, *arguments): raise BrokenProcessPool("a worker died")
+
+
+def test_finished_render_does_not_deadlock():
+    render_service = service.Render_Service(1)
+    render_service.executor.shutdown() ; render_service.executor = Finished_Executor()
+    request = service.parse_request("m=6&h=2")
+    results = list()
+    thread = threading.Thread(target=lambda: results.extend((render_service.get(request), render_service.get(request))), daemon=True)
+    thread.start() ; thread.join(10)
+    assert not thread.is_alive()
+    assert results == [(b"body", "miss"), (b"body", "hit")]
+    assert render_service.health()["renders_in_progress"] == 0
+
+
+def test_broken_pool_is_replaced(monkeypatch):
+    monkeypatch.setattr(service, "ProcessPoolExecutor", lambda max_workers: Finished_Executor())
+    render_service = service.Render_Service(1, queue_size=0)
+    render_service.executor = Broken_Executor()
+    assert render_service.get(service.parse_request("m=6&h=2")) == (b"body", "miss")
+    assert isinstance(render_service.executor, Finished_Executor) and render_service.slots.acquire(blocking=False)
+
+
+def test_failed_submit_frees_its_slot():
+    render_service = service.Render_Service(1, queue_size=0)
+    render_service.shutdown()
+    for h in range(3): # more requests than slots
+        with pytest.raises(RuntimeError): render_service.get(service.parse_request("m=6&h={}".format(h)))
+    assert render_service.slots.acquire(blocking=False) and render_service.health()["renders_in_progress"] == 0
+
+
+def test_max_points_depend_on_the_format(monkeypatch):
+    monkeypatch.setattr(service, "ProcessPoolExecutor", lambda max_workers: Finished_Executor())
+    server = service.serve(port=0, service=service.Render_Service(1))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    def status(query):
+        try: return urllib.request.urlopen("http://127.0.0.1:{}/pattern?{}".format(server.server_address[1], query)).status
+        except urllib.error.HTTPError as error: return error.code
+    try:
+        assert service.Render_Service.points(service.parse_request("m=64&h=60")) == 124864
+        assert status("m=64&h=60&format=svg") == 400 and status("m=64&h=60&format=pdf") == 400
+        assert status("m=64&h=60&format=png") == 200 and status("m=64&h=60&format=fold") == 200
+    finally:
+        server.shutdown() ; server.server_close()
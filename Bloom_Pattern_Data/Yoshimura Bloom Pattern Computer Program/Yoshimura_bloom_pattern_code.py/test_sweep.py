@@ -0,0 +1,18 @@
+'''regression tests of sweep.py, run with "python -m pytest" from this directory.'''
+
+import pytest
+import sweep
+
+
+@pytest.mark.parametrize("crease_is_invert", (False, True))
+def test_sweep_matches_built_patterns(crease_is_invert):
+    table = sweep.sweep(*sweep.grid([4,5,6,9], [0,1,2,5], [1.0,2.5]), crease_is_invert=crease_is_invert)
+    assert table["valid"].all()
+    assert sweep.verify(table, crease_is_invert=crease_is_invert) == []
+
+
+def test_invalid_parameters_are_kept():
+    table = sweep.sweep([4.5, 4, 4, 3, 4], [1, 1.5, 1, 1, -1], [1, 1, 1, 1, 1])
+    assert table["valid"].tolist() == [False, False, True, False, False]
+    assert table["m"].tolist() == [4.5, 4, 4, 3, 4] and table["h"].tolist() == [1, 1.5, 1, 1, -1]
+    assert (table["points"][~table["valid"]] == 0).all() and table["points"][2] == 16